@@ -1,57 +1,130 @@
+import click
 from flask import Flask, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from extensions import db, jwt
 from routes import api
 from config import Config
 from reset_routes import reset_bp
+import email_service
+import instrumentation
+import compression
+import json_provider
+import replicas
 import os
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-allowed_origins = [
-    "https://tuinue-wasichana-v3-1.onrender.com",
-    "https://tuinue-wasichana-v3.onrender.com"
-]
-
-if os.environ.get('FLASK_ENV') == 'development':
-    allowed_origins.extend([
-        "http://localhost:3000",
-        "http://127.0.0.1:3000"
-    ])
-
-CORS(app, resources={
-    r"/api/*": {
-        "origins": allowed_origins,
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-        "allow_headers": [
-            "Content-Type", 
-            "Authorization",
-            "X-Requested-With",
-            "Accept"
-        ],
-        "expose_headers": [
-            "Content-Disposition",
-            "X-Total-Count"
-        ],
-        "supports_credentials": True,
-        "max_age": 86400  
-    }
-})
-
-db.init_app(app)
-jwt.init_app(app)
-
-app.register_blueprint(api, url_prefix='/api')
-app.register_blueprint(reset_bp, url_prefix='/api/password-reset')
-
-with app.app_context():
-    from models import User, Charity, Donation, Story, CreditTransaction
-    db.create_all()
-
-@app.route('/api/test')
-def test():
-    return {"message": "API is running"}, 200
+# Importing this module does no I/O: the database is first touched by the
+# first request, and schema work is left to the CLI commands below
+# (`flask init-db`, `flask apply-indexes`, `flask rebuild-rollups`,
+# `flask rebuild-search`).
+
+def create_app(config=Config):
+    app = Flask(__name__)
+    if isinstance(config, dict):
+        app.config.from_object(Config)
+        app.config.update(config)
+    else:
+        app.config.from_object(config)
+    json_provider.init_app(app)
+    if app.config.get('PROXY_FIX_X_FOR'):
+        # Behind a reverse proxy, take the client IP from X-Forwarded-For
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+    allowed_origins = [
+        "https://tuinue-wasichana-v3-1.onrender.com",
+        "https://tuinue-wasichana-v3.onrender.com"
+    ]
+
+    if os.environ.get('FLASK_ENV') == 'development':
+        allowed_origins.extend([
+            "http://localhost:3000",
+            "http://127.0.0.1:3000"
+        ])
+
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": allowed_origins,
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+            "allow_headers": [
+                "Content-Type", 
+                "Authorization",
+                "X-Requested-With",
+                "Accept",
+                "If-None-Match",
+                "Last-Event-ID"
+            ],
+            "expose_headers": [
+                "Content-Disposition",
+                "X-Total-Count",
+                "X-Next-Cursor",
+                "ETag",
+                "Server-Timing",
+                "Retry-After"
+            ],
+            "supports_credentials": True,
+            "max_age": 86400  
+        }
+    })
+
+    replicas.init_app(app)
+    db.init_app(app)
+    jwt.init_app(app)
+    email_service.init_app(app)
+    instrumentation.init_app(app)
+    compression.init_app(app)
+
+    app.register_blueprint(api, url_prefix='/api')
+    app.register_blueprint(reset_bp, url_prefix='/api/password-reset')
+
+    register_commands(app)
+
+    @app.route('/api/test')
+    def test():
+        return {"message": "API is running"}, 200
+
+    return app
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db():
+        import models
+        db.create_all()
+        print('Database tables created')
+
+    @app.cli.command('apply-indexes')
+    def apply_indexes():
+        import migrations
+        created = migrations.apply_indexes()
+        print(f'{len(created)} index(es) created')
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups():
+        import rollups
+        rollups.rebuild()
+        print('Rollup tables rebuilt')
+
+    @app.cli.command('rebuild-search')
+    def rebuild_search():
+        import search
+        search.rebuild()
+        print('Search index rebuilt')
+
+    @app.cli.command('import-donors')
+    @click.argument('source', type=click.File('r', encoding='utf-8'))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+                  help='Input format; guessed from the file extension by default.')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Rows per insert batch.')
+    @click.option('--workers', type=int, help='Hashing processes; defaults to the CPU count.')
+    def import_donors(source, fmt, chunk_size, workers):
+        """Create donor accounts from a CSV or NDJSON file ('-' for stdin)."""
+        import donor_import
+        fmt = fmt or ('ndjson' if source.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+        stats = donor_import.import_donors(source, fmt, chunk_size, workers,
+                                           progress=lambda stats: print(stats, flush=True))
+        print(f'Done: {stats}')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    app.run(debug=True)
@@ -0,0 +1,76 @@
+import threading
+from collections import namedtuple
+from functools import wraps
+from flask import current_app, g, jsonify
+from flask_jwt_extended import get_jwt_identity
+from cache import TTLCache
+from extensions import db
+from models import User, Charity
+from replicas import use_primary
+
+# Resolves the caller behind a JWT. The role and charity id of recent callers
+# are kept in a short-lived cache so role checks cost no queries; on a miss
+# the user and their charity are fetched together with a single joined query.
+
+Principal = namedtuple('Principal', ['user_id', 'role', 'charity_id'])
+
+_principals = None
+_principals_lock = threading.Lock()
+
+def principal_cache():
+    global _principals
+    if _principals is None:
+        with _principals_lock:
+            if _principals is None:
+                _principals = TTLCache(
+                    current_app.config.get('PRINCIPAL_CACHE_SIZE', 4096),
+                    current_app.config.get('PRINCIPAL_CACHE_TTL', 30)
+                )
+    return _principals
+
+def load_principal(identity):
+    """Return the Principal for a JWT identity, or None if the user is gone."""
+    if not identity:
+        return None
+    cache = principal_cache()
+    principal = cache.get(str(identity))
+    if principal is None:
+        # Always read from the primary, so a freshly registered account is
+        # found even while the replicas lag behind
+        with use_primary():
+            row = db.session.query(User, Charity).outerjoin(Charity, Charity.user_id == User.id) \
+                .filter(User.id == int(identity)).first()
+        if row is None:
+            return None
+        user, charity = row
+        g.user = user
+        g.charity = charity
+        principal = Principal(user.id, user.role, charity.id if charity else None)
+        cache.set(str(identity), principal)
+    g.principal = principal
+    return principal
+
+def invalidate_principal(user_id):
+    principal_cache().pop(str(user_id))
+
+def current_user():
+    if g.get('user') is None:
+        g.user = db.session.get(User, g.principal.user_id)
+    return g.user
+
+def current_charity():
+    if g.get('charity') is None and g.principal.charity_id is not None:
+        g.charity = db.session.get(Charity, g.principal.charity_id)
+    return g.get('charity')
+
+def role_required(role):
+    """Reject callers whose role differs; use under ``@jwt_required()``."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            principal = load_principal(get_jwt_identity())
+            if not principal or principal.role != role:
+                return jsonify({'message': 'Access denied'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,73 @@
+"""Response size and latency per content coding on a seeded database.
+
+Server time is measured through the test client with the response cache
+disabled, so every request pays for compression. Transfer time is estimated
+from the body size at --mbps.
+
+Usage (from backend/):
+    python benchmarks/bench_compression.py --donations 50000 --mbps 10
+"""
+import argparse
+import os
+import statistics
+import time
+
+from common import auth_headers, load_app
+from seed import seed
+
+CODINGS = ['identity', 'gzip', 'br']
+
+def endpoints(summary):
+    return [
+        ('GET /stories', '/api/stories', None),
+        ('GET /charities', '/api/charities', None),
+        ('GET /charities/<id>', f"/api/charities/{summary['charity_id']}", None),
+        ('GET /admin/charities', '/api/admin/charities', 'admin_id'),
+        ('GET /admin/donors', '/api/admin/donors', 'admin_id'),
+        ('GET /admin/export/donations', '/api/admin/export/donations?format=csv', 'admin_id'),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URI; defaults to a temporary SQLite file')
+    parser.add_argument('--donors', type=int, default=1000)
+    parser.add_argument('--charities', type=int, default=50)
+    parser.add_argument('--donations', type=int, default=50000)
+    parser.add_argument('--stories', type=int, default=1000)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--mbps', type=float, default=10.0, help='link speed for the transfer estimate')
+    args = parser.parse_args()
+
+    app, db_file = load_app(args.database, RESPONSE_CACHE_SIZE=0)
+    import compression
+    with app.app_context():
+        summary = seed(args.donors, args.charities, args.donations, args.stories, args.transactions)
+    client = app.test_client()
+    headers = {'admin_id': auth_headers(app, summary['admin_id'])}
+    codings = [c for c in CODINGS if c != 'br' or compression.brotli is not None]
+
+    print(f'{"endpoint":<28}{"coding":>9}{"KiB":>10}{"ratio":>7}{"server ms":>11}{"transfer ms":>13}{"total ms":>10}')
+    for name, url, who in endpoints(summary):
+        identity_size = None
+        for coding in codings:
+            request_headers = dict(headers.get(who, {}), **{'Accept-Encoding': coding})
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = client.get(url, headers=request_headers)
+                body = response.get_data()
+                timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (url, response.status_code)
+            assert response.headers.get('Content-Encoding', 'identity') == coding, (url, coding)
+            size = len(body)
+            identity_size = identity_size or size
+            server = statistics.median(timings)
+            transfer = size * 8 / (args.mbps * 1000)
+            print(f'{name:<28}{coding:>9}{size / 1024:>10.1f}{identity_size / size:>6.1f}x'
+                  f'{server:>11.2f}{transfer:>13.2f}{server + transfer:>10.2f}')
+    if db_file:
+        os.remove(db_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Donor import throughput: POST /register one by one vs `flask import-donors` chunks.
+
+Every run starts from an empty database. A tenth of the generated rows
+repeat an earlier email, so the duplicate checks are exercised too.
+
+Usage (from backend/):
+    python benchmarks/bench_import.py --users 5000 --workers 1 2 4 --rounds 12
+"""
+import argparse
+import csv
+import io
+import os
+import time
+
+from common import load_app
+
+def generate(users):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['email', 'username', 'password', 'credits'])
+    for i in range(users):
+        n = i - 1 if i % 10 == 9 else i
+        writer.writerow([f'donor{n}@example.com', f'donor{i}', f'password-{i}', i % 100])
+    return buffer.getvalue()
+
+def reset(app):
+    from extensions import db
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--register-sample', type=int, default=200,
+                        help='users sent through POST /register to estimate its rate')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost')
+    args = parser.parse_args()
+
+    app, db_file = load_app(BCRYPT_LOG_ROUNDS=args.rounds)
+    import donor_import
+    data = generate(args.users)
+    print(f'{args.users} users, bcrypt cost {args.rounds}, {os.cpu_count()} CPUs')
+
+    client = app.test_client()
+    started = time.perf_counter()
+    for i in range(args.register_sample):
+        client.post('/api/register', json={'email': f'r{i}@example.com', 'username': f'r{i}',
+                                           'password': 'password', 'role': 'donor'})
+    rate = args.register_sample / (time.perf_counter() - started)
+    print(f'  {"POST /register":<24}{rate:10.1f} users/s')
+
+    for workers in args.workers:
+        reset(app)
+        with app.app_context():
+            stats = donor_import.import_donors(io.StringIO(data), 'csv', args.chunk_size, workers)
+        label = f'import, {workers} worker(s)'
+        print(f'  {label:<24}{stats.rate:10.1f} users/s  ({stats.imported} imported, '
+              f'{stats.duplicates} duplicates)')
+    os.remove(db_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Endpoint latency on a seeded database with and without the model indexes.
+
+Usage (from backend/):
+    python benchmarks/bench_indexes.py --donations 200000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import time
+
+from common import auth_headers, load_app
+from seed import seed
+
+def endpoints(summary):
+    return [
+        ('GET /charities', '/api/charities', None),
+        ('GET /charities/<id>', f"/api/charities/{summary['charity_id']}", None),
+        ('GET /stories', '/api/stories', None),
+        ('GET /stories?charity_id', f"/api/stories?charity_id={summary['charity_id']}", None),
+        ('GET /admin/charities', '/api/admin/charities', 'admin_id'),
+        ('GET /admin/donors', '/api/admin/donors', 'admin_id'),
+        ('GET /admin-overview', '/api/admin-overview', 'admin_id'),
+        ('GET /charity/donations', '/api/charity/donations', 'charity_user_id'),
+        ('GET /donor/history', '/api/donor/history', 'donor_id'),
+        ('GET /donor/credit-history', '/api/donor/credit-history', 'donor_id'),
+    ]
+
+def measure(app, summary, repeat):
+    client = app.test_client()
+    headers = {key: auth_headers(app, summary[key]) for key in ('admin_id', 'charity_user_id', 'donor_id')}
+    results = {}
+    for name, url, who in endpoints(summary):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url, headers=headers.get(who, {}))
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (url, response.status_code)
+        results[name] = statistics.median(timings)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URI; defaults to a temporary SQLite file')
+    parser.add_argument('--donors', type=int, default=2000)
+    parser.add_argument('--charities', type=int, default=100)
+    parser.add_argument('--donations', type=int, default=100000)
+    parser.add_argument('--stories', type=int, default=2000)
+    parser.add_argument('--transactions', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    # Disable the response cache so every request reaches the database
+    app, db_file = load_app(args.database, RESPONSE_CACHE_SIZE=0)
+    from extensions import db
+    import migrations
+
+    with app.app_context():
+        summary = seed(args.donors, args.charities, args.donations, args.stories, args.transactions)
+        migrations.drop_indexes()
+        db.session.execute(db.text('ANALYZE'))
+    before = measure(app, summary, args.repeat)
+    with app.app_context():
+        migrations.apply_indexes(log=lambda message: None)
+        db.session.execute(db.text('ANALYZE'))
+    after = measure(app, summary, args.repeat)
+
+    print(f'{"endpoint":<26}{"no index ms":>13}{"indexed ms":>13}{"speedup":>9}')
+    for name in before:
+        print(f'{name:<26}{before[name]:>13.2f}{after[name]:>13.2f}{before[name] / after[name]:>8.1f}x')
+    if db_file:
+        os.remove(db_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Login throughput against the bcrypt worker pool.
+
+Usage (from backend/):
+    python benchmarks/bench_login.py --workers 1 2 4 --clients 8 --logins 64
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import load_app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8, help='concurrent request threads')
+    parser.add_argument('--logins', type=int, default=64, help='logins per run')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost')
+    args = parser.parse_args()
+
+    app, db_file = load_app(BCRYPT_LOG_ROUNDS=args.rounds)
+    import passwords
+    credentials = {'email': 'bench@example.com', 'password': 'bench-password'}
+    app.test_client().post('/api/register', json=dict(credentials, username='bench', role='donor'))
+
+    def login(_):
+        response = app.test_client().post('/api/login', json=credentials)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    print(f'bcrypt cost {args.rounds}, {args.clients} client threads, {args.logins} logins per run')
+    for workers in args.workers:
+        app.config['BCRYPT_WORKERS'] = workers
+        passwords.reset_pool()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as clients:
+            list(clients.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - started
+        print(f'  {workers:>3} hash workers: {args.logins / elapsed:8.1f} logins/s')
+    passwords.reset_pool()
+    os.remove(db_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Serialization throughput: hand-built dicts vs compiled projections, stdlib json vs orjson.
+
+Runs on transient (unsaved) model instances, so no database is involved.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py --charities 2000 --donations 50000
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from common import load_app
+
+def build(charities, donations):
+    from models import User, Charity, CharityStats, Donation
+    rng = random.Random(0)
+    now = datetime(2025, 1, 1)
+    donors = [User(id=i, username=f'donor{i}', email=f'donor{i}@example.com', role='donor')
+              for i in range(1, 201)]
+    rows = []
+    for i in range(1, charities + 1):
+        charity = Charity(id=i, user_id=i, name=f'Charity {i}', description='Pads and school fees ' * 8,
+                          mission_statement='Keep girls in school', location='Nairobi', founded_year=2010,
+                          impact_metrics='1,000 girls reached', contact_person='Jane', contact_phone='0700000000',
+                          website='https://example.org', photo_url='https://example.org/p.jpg',
+                          approved=True, rejected=False)
+        charity.stats = CharityStats(charity_id=i, total_raised=rng.randint(0, 10 ** 6),
+                                     donation_count=rng.randint(0, 1000), donor_count=rng.randint(0, 200),
+                                     last_donation_at=now - timedelta(minutes=i))
+        rows.append(charity)
+    gifts = []
+    for i in range(1, donations + 1):
+        gifts.append(Donation(id=i, donor=rng.choice(donors), charity_id=rng.choice(rows).id,
+                              amount=rng.randint(1, 500), is_anonymous=rng.random() < 0.2,
+                              date=now - timedelta(seconds=i)))
+    return rows, gifts
+
+# The per-handler dict literals this repo used before the serializer registry
+def charity_by_hand(c):
+    return {
+        'id': c.id, 'name': c.name, 'description': c.description,
+        'mission_statement': c.mission_statement, 'location': c.location,
+        'founded_year': c.founded_year, 'impact_metrics': c.impact_metrics,
+        'contact_person': c.contact_person, 'contact_phone': c.contact_phone,
+        'website': c.website, 'photo_url': c.photo_url,
+        'total_raised': c.stats.total_raised if c.stats else 0,
+        'donation_count': c.stats.donation_count if c.stats else 0,
+        'donor_count': c.stats.donor_count if c.stats else 0,
+        'last_donation_at': c.stats.last_donation_at.isoformat() if c.stats and c.stats.last_donation_at else None
+    }
+
+def donation_by_hand(d):
+    return {
+        'id': d.id,
+        'donor_username': 'Anonymous' if d.is_anonymous else d.donor.username,
+        'amount': d.amount,
+        'date': d.date.isoformat(),
+        'is_anonymous': d.is_anonymous
+    }
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--charities', type=int, default=2000)
+    parser.add_argument('--donations', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5, help='report the best of this many runs')
+    args = parser.parse_args()
+
+    app, db_file = load_app()
+    import serializers
+    import json_provider
+    charities, donations = build(args.charities, args.donations)
+    cases = [
+        ('charities', charities, charity_by_hand, serializers.charity_listing),
+        ('donations', donations, donation_by_hand, serializers.received_donation),
+    ]
+    encoders = [('stdlib json', lambda obj: json.dumps(obj, separators=(',', ':'), sort_keys=True))]
+    if json_provider.orjson is not None:
+        orjson = json_provider.orjson
+        encoders.append(('orjson', lambda obj: orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)))
+    else:
+        print('orjson is not installed; only the stdlib encoder is measured')
+
+    for label, rows, by_hand, compiled in cases:
+        assert [by_hand(row) for row in rows[:50]] == [compiled(row) for row in rows[:50]]
+        print(f'{label} ({len(rows)} rows)')
+        payload = [compiled(row) for row in rows]
+        for name, build_dicts in (('hand-built dicts', by_hand), ('compiled projection', compiled)):
+            elapsed = best_of(args.repeat, lambda: [build_dicts(row) for row in rows])
+            print(f'  {name:<22} {len(rows) / elapsed:12,.0f} rows/s')
+        for name, encode in encoders:
+            elapsed = best_of(args.repeat, lambda: encode(payload))
+            print(f'  {name + " encode":<22} {len(rows) / elapsed:12,.0f} rows/s '
+                  f'({len(encode(payload)) / 1024:,.0f} KiB)')
+    os.remove(db_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Cold-start costs: module import, create_app(), first request and worker fork.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from common import BACKEND, load_app
+from cache import response_cache
+
+IMPORT_SNIPPET = (
+    'import time; started = time.perf_counter(); import app; '
+    'print((time.perf_counter() - started) * 1000)'
+)
+
+def import_ms(env):
+    output = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def fork_ms(app):
+    """Time from fork() to a child that has served its first request."""
+    started = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        with app.app_context():
+            response_cache().clear()
+        status = app.test_client().get('/api/charities').status_code
+        os._exit(0 if status == 200 else 1)
+    _, status = os.waitpid(pid, 0)
+    assert status == 0
+    return (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app, db_file = load_app()
+    from app import create_app
+    env = dict(os.environ)
+
+    results = {'import app': statistics.median(import_ms(env) for _ in range(args.repeat))}
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        create_app()
+        timings.append((time.perf_counter() - started) * 1000)
+    results['create_app()'] = statistics.median(timings)
+
+    first, second = [], []
+    for _ in range(args.repeat):
+        fresh = create_app()
+        client = fresh.test_client()
+        with fresh.app_context():
+            response_cache().clear()
+        for bucket in (first, second):
+            started = time.perf_counter()
+            client.get('/api/charities')
+            bucket.append((time.perf_counter() - started) * 1000)
+    results['first request'] = statistics.median(first)
+    results['warm request'] = statistics.median(second)
+
+    if hasattr(os, 'fork'):
+        with app.app_context():
+            from extensions import db
+            # Like gunicorn's master, never hand a live pool to the children
+            db.engine.dispose()
+        results['fork + first request'] = statistics.median(fork_ms(app) for _ in range(args.repeat))
+
+    for name, ms in results.items():
+        print(f'{name:<24}{ms:>9.1f} ms')
+    if db_file:
+        os.remove(db_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+def load_app(database=None, **config):
+    """Import the Flask app against ``database`` (a temporary SQLite file by
+    default). Returns the app and the temporary file to delete, if any."""
+    db_file = None
+    if not database:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        database = 'sqlite:///' + db_file
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database
+    # Config reads the environment once, so later calls pass the URI directly
+    config.setdefault('SQLALCHEMY_DATABASE_URI', database)
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret-with-enough-bytes')
+    os.environ.setdefault('BCRYPT_LOG_ROUNDS', '4')
+    # Benchmarks drive the auth endpoints far faster than any real client
+    config.setdefault('RATE_LIMIT_ENABLED', False)
+    from app import create_app
+    from extensions import db
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app, db_file
+
+def auth_headers(app, user_id):
+    """Mint a token the same way /login does, without paying for bcrypt."""
+    from flask_jwt_extended import create_access_token
+    from extensions import db
+    from models import User, Charity
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        charity = Charity.query.filter_by(user_id=user_id).first()
+        token = create_access_token(identity=str(user.id), additional_claims={
+            'role': user.role,
+            'user_id': str(user.id),
+            'charity_id': charity.id if charity else None
+        })
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,85 @@
+"""Show which database each request's queries go to with a read replica configured.
+
+With no arguments, a temporary SQLite primary is seeded and copied to a second
+SQLite file that serves as the replica. To use Postgres, pass a primary and
+a replica that streams from it; the primary is seeded and the replica is
+given --lag seconds to catch up.
+
+Usage (from backend/):
+    python benchmarks/replica_routing.py
+    python benchmarks/replica_routing.py --primary postgresql:///tuinue --replica postgresql:///tuinue_replica
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from common import auth_headers, load_app
+from seed import seed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--primary', help='primary SQLAlchemy URI; defaults to a temporary SQLite file')
+    parser.add_argument('--replica', help='replica SQLAlchemy URI; defaults to a copy of the SQLite primary')
+    parser.add_argument('--lag', type=float, default=1.0, help='seconds to wait for a real replica')
+    args = parser.parse_args()
+    if args.primary and not args.replica:
+        parser.error('--replica is required with --primary')
+
+    replica_file = None
+    replica = args.replica
+    if not replica:
+        replica_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        replica = 'sqlite:///' + replica_file
+    app, db_file = load_app(args.primary, SQLALCHEMY_REPLICA_URIS=[replica], RESPONSE_CACHE_SIZE=0,
+                            PRINCIPAL_CACHE_SIZE=0)
+    from extensions import db
+
+    with app.app_context():
+        summary = seed(donors=50, charities=5, donations=500, stories=20, transactions=100)
+        if replica_file:
+            with sqlite3.connect(db_file) as source, sqlite3.connect(replica_file) as target:
+                source.backup(target)
+        else:
+            time.sleep(args.lag)
+
+    # Only count this thread's queries, not the email outbox sender's
+    counts = {}
+    main_thread = threading.get_ident()
+    def count(name):
+        if threading.get_ident() == main_thread:
+            counts[name] = counts.get(name, 0) + 1
+
+    with app.app_context():
+        for name, engine in (('primary', db.engines[None]), ('replica', db.engines['replica0'])):
+            event.listen(engine, 'before_cursor_execute', lambda *a, name=name: count(name))
+
+    client = app.test_client()
+    donor = auth_headers(app, summary['donor_id'])
+    admin = auth_headers(app, summary['admin_id'])
+    steps = [
+        ('GET /charities', 'get', '/api/charities', None, None),
+        ('GET /stories', 'get', '/api/stories', None, None),
+        ('GET /admin/donors', 'get', '/api/admin/donors', admin, None),
+        ('GET /donor/history', 'get', '/api/donor/history', donor, None),
+        ('POST /credits/purchase', 'post', '/api/credits/purchase', donor, {'amount': 100}),
+        ('GET /donor/credits (just wrote)', 'get', '/api/donor/credits', donor, None),
+        ('GET /donor/history (just wrote)', 'get', '/api/donor/history', donor, None),
+        ('GET /admin-overview', 'get', '/api/admin-overview', admin, None),
+    ]
+    print(f'{"request":<34}{"status":>7}{"primary":>9}{"replica":>9}')
+    for label, method, url, headers, payload in steps:
+        counts.clear()
+        response = getattr(client, method)(url, headers=headers or {}, json=payload)
+        print(f'{label:<34}{response.status_code:>7}{counts.get("primary", 0):>9}{counts.get("replica", 0):>9}')
+
+    for path in (db_file, replica_file):
+        if path:
+            os.remove(path)
+
+if __name__ == '__main__':
+    main()
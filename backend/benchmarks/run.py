@@ -0,0 +1,294 @@
+"""Benchmark every API route on a seeded database.
+
+Drives each route in routes.py and reset_routes.py through the Flask test
+client and, with --concurrency above 1, through a threaded HTTP server hit
+by concurrent clients. The SSE stream is timed from connect until its replay
+of missed donations has arrived. Reports p50/p95/p99 latency, throughput
+and SQL queries per request, and can save the results as JSON and compare them
+against an earlier run.
+
+Usage (from backend/):
+    python benchmarks/run.py --donations 50000 --requests 50 --output bench.json
+    python benchmarks/run.py --concurrency 8 --compare bench.json
+    python benchmarks/run.py --database postgresql://localhost/tuinue_bench --only charities
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from common import BACKEND, auth_headers, load_app
+from seed import PASSWORD, seed
+
+REPLAY_EVENTS = 50
+METRICS_TOKEN = 'bench-metrics-token'
+
+def scenarios(ctx):
+    """(name, method, path(i), who, body(i), events) for every route, where
+    ``events`` is how many SSE messages to read before disconnecting from a
+    stream (None for ordinary responses)."""
+    charity_id = ctx['charity_id']
+    run = ctx['run']
+    return [(*scenario, None) if len(scenario) == 5 else scenario for scenario in [
+        ('POST /register', 'POST', lambda i: '/api/register', None,
+         lambda i: {'email': f'bench{run}-{i}@example.com', 'password': PASSWORD,
+                    'username': f'bench{run}-{i}', 'role': 'donor'}),
+        ('POST /login', 'POST', lambda i: '/api/login', None,
+         lambda i: {'email': ctx['donor_email'], 'password': PASSWORD}),
+        ('GET /verify-token', 'GET', lambda i: '/api/verify-token', 'donor', None),
+        ('GET /admin-overview', 'GET', lambda i: '/api/admin-overview', 'admin', None),
+        ('GET /admin/charities', 'GET', lambda i: '/api/admin/charities', 'admin', None),
+        ('POST /admin/charities', 'POST', lambda i: '/api/admin/charities', 'admin',
+         lambda i: {'charity_id': charity_id, 'approved': True, 'rejected': False}),
+        # Flips the charities seeded as pending between approved and rejected
+        ('POST /admin/charities/bulk', 'POST', lambda i: '/api/admin/charities/bulk', 'admin',
+         lambda i: {'decision': 'reject' if i % 2 else 'approve', 'charity_ids': ctx['pending_charity_ids']}),
+        ('GET /admin/donors', 'GET', lambda i: '/api/admin/donors', 'admin', None),
+        ('GET /admin/export/donations', 'GET', lambda i: '/api/admin/export/donations?format=ndjson', 'admin', None),
+        ('GET /admin/export/credit-transactions', 'GET', lambda i: '/api/admin/export/credit-transactions', 'admin', None),
+        ('POST /credits/purchase', 'POST', lambda i: '/api/credits/purchase', 'donor', lambda i: {'amount': 10}),
+        ('GET /charities', 'GET', lambda i: '/api/charities', None, None),
+        ('GET /charities?sort=total_raised', 'GET', lambda i: '/api/charities?sort=total_raised', None, None),
+        ('GET /charities/<id>', 'GET', lambda i: f'/api/charities/{charity_id}', None, None),
+        ('GET /stories', 'GET', lambda i: '/api/stories', None, None),
+        ('GET /stories?charity_id', 'GET', lambda i: f'/api/stories?charity_id={charity_id}', None, None),
+        ('POST /stories', 'POST', lambda i: '/api/stories', 'charity',
+         lambda i: {'title': f'Bench story {run}-{i}', 'content': 'Benchmark story body. ' * 40}),
+        ('PUT /stories/<id>', 'PUT', lambda i: f"/api/stories/{ctx['story_id']}", 'charity',
+         lambda i: {'title': f'Edited {i}', 'content': 'Edited benchmark story body. ' * 40}),
+        ('GET /search', 'GET', lambda i: '/api/search?q=school+girls', None, None),
+        ('GET /charity/status', 'GET', lambda i: '/api/charity/status', 'charity', None),
+        ('GET /charity/donations', 'GET', lambda i: '/api/charity/donations', 'charity', None),
+        # The retry hint plus the replayed donations
+        ('GET /charity/donations/stream', 'GET',
+         lambda i: f"/api/charity/donations/stream?last_event_id={ctx['replay_from']}", 'charity', None,
+         1 + ctx['replay_count']),
+        ('GET /donor/credits', 'GET', lambda i: '/api/donor/credits', 'donor', None),
+        ('GET /donor/credit-history', 'GET', lambda i: '/api/donor/credit-history', 'donor', None),
+        ('GET /donor/history', 'GET', lambda i: '/api/donor/history', 'donor', None),
+        ('POST /donor/donate', 'POST', lambda i: '/api/donor/donate', 'donor',
+         lambda i: {'charity_id': charity_id, 'amount': 1}),
+        ('POST /donor/donate/batch', 'POST', lambda i: '/api/donor/donate/batch', 'donor',
+         lambda i: {'donations': [{'charity_id': charity_id, 'amount': 1}] * 5}),
+        ('POST /password-reset/request', 'POST', lambda i: '/api/password-reset/request', None,
+         lambda i: {'email': ctx['donor_email']}),
+        ('POST /password-reset/confirm', 'POST', lambda i: f"/api/password-reset/confirm/{ctx['reset_token']}", None,
+         lambda i: {'password': PASSWORD}),
+        ('GET /metrics', 'GET', lambda i: '/api/metrics', 'metrics', None),
+    ]]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def summarize(timings, queries, elapsed, failures):
+    return {
+        'requests': len(timings),
+        'failures': failures,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+        'queries_per_request': round(sum(queries) / len(queries), 2)
+    }
+
+def instrument(app):
+    """Count SQL statements per request and report them in a header.
+    Streamed bodies run after the header is sent, so exports report only
+    the queries made before streaming starts."""
+    from flask import g, has_app_context
+    from sqlalchemy import event
+    from extensions import db
+
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(*args):
+            if has_app_context():
+                g.bench_queries = g.get('bench_queries', 0) + 1
+
+    @app.after_request
+    def report(response):
+        response.headers['X-Bench-Queries'] = str(g.get('bench_queries', 0))
+        return response
+
+def read_events(chunks, events):
+    """Consume ``events`` SSE messages from an iterable of body chunks."""
+    seen, tail = 0, b''
+    for chunk in chunks:
+        # A message's closing blank line may straddle two chunks
+        seen += (tail + chunk).count(b'\n\n')
+        tail = chunk[-1:]
+        if seen >= events:
+            return
+
+def run_test_client(app, plan, headers, requests):
+    client = app.test_client()
+    results = {}
+    for name, method, path, who, body, events in plan:
+        timings, queries, failures = [], [], 0
+        started = time.perf_counter()
+        for i in range(requests):
+            t0 = time.perf_counter()
+            response = client.open(path(i), method=method, headers=headers.get(who, {}),
+                                   json=body(i) if body else None, buffered=events is None)
+            if events is None:
+                response.get_data()
+            else:
+                if response.status_code < 400:
+                    read_events(response.iter_encoded(), events)
+                response.close()
+            timings.append((time.perf_counter() - t0) * 1000)
+            queries.append(int(response.headers.get('X-Bench-Queries', 0)))
+            failures += response.status_code >= 400
+        results[name] = summarize(timings, queries, time.perf_counter() - started, failures)
+    return results
+
+def run_http(app, plan, headers, requests, concurrency):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    def call(method, url, hdrs, payload, events):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(base + url, data=data, method=method,
+                                         headers=dict(hdrs, **({'Content-Type': 'application/json'} if data else {})))
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                if events is None:
+                    response.read()
+                else:
+                    read_events(iter(lambda: response.read1(65536), b''), events)
+                status, count = response.status, response.headers.get('X-Bench-Queries', 0)
+        except urllib.error.HTTPError as e:
+            e.read()
+            status, count = e.code, e.headers.get('X-Bench-Queries', 0)
+        return (time.perf_counter() - t0) * 1000, int(count), status
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for name, method, path, who, body, events in plan:
+                started = time.perf_counter()
+                outcomes = list(pool.map(
+                    lambda i: call(method, path(i), headers.get(who, {}), body(i) if body else None, events),
+                    range(requests)
+                ))
+                results[name] = summarize([o[0] for o in outcomes], [o[1] for o in outcomes],
+                                          time.perf_counter() - started, sum(o[2] >= 400 for o in outcomes))
+    finally:
+        server.shutdown()
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(title, results, baseline=None):
+    print(f'\n{title}')
+    header = f'{"endpoint":<40}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"req/s":>9}{"queries":>9}{"fail":>6}'
+    print(header + ('  p50 vs baseline' if baseline else ''))
+    for name, r in results.items():
+        line = (f'{name:<40}{r["p50_ms"]:>9.2f}{r["p95_ms"]:>9.2f}{r["p99_ms"]:>9.2f}'
+                f'{r["throughput_rps"]:>9.1f}{r["queries_per_request"]:>9.1f}{r["failures"]:>6}')
+        if baseline and name in baseline:
+            before = baseline[name]['p50_ms']
+            line += f'  {(r["p50_ms"] - before) / before * 100:+.0f}%' if before else ''
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URI (e.g. a local Postgres); defaults to a temporary SQLite file')
+    parser.add_argument('--donors', type=int, default=1000)
+    parser.add_argument('--charities', type=int, default=50)
+    parser.add_argument('--donations', type=int, default=20000)
+    parser.add_argument('--stories', type=int, default=500)
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=30, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=1, help='also run the HTTP driver with this many clients')
+    parser.add_argument('--only', help='only endpoints whose name contains this text')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare p50 against')
+    args = parser.parse_args()
+
+    # The HTTP server only notices a stream's client has gone at its next
+    # heartbeat, so allow one slot per request and keep heartbeats short
+    app, db_file = load_app(args.database, SSE_MAX_STREAMS=max(4, args.requests), SSE_HEARTBEAT_SECONDS=1,
+                            METRICS_TOKEN=METRICS_TOKEN)
+    from extensions import db
+    from models import Charity, Donation, Story, User
+    from token_service import generate_reset_token
+
+    with app.app_context():
+        summary = seed(args.donors, args.charities, args.donations, args.stories, args.transactions)
+        donor = db.session.get(User, summary['donor_id'])
+        story = Story.query.filter_by(charity_id=summary['charity_id']).first()
+        if story is None:
+            story = Story(charity_id=summary['charity_id'], title='Bench', content='Bench story')
+            db.session.add(story)
+            db.session.commit()
+        pending = [c.id for c in Charity.query.filter_by(approved=False, rejected=False)]
+        # Replay the charity's REPLAY_EVENTS newest donations to each stream
+        replayed = [d.id for d in Donation.query.filter_by(charity_id=summary['charity_id'])
+                    .order_by(Donation.id.desc()).limit(REPLAY_EVENTS + 1)]
+        ctx = dict(summary, run=int(time.time()), donor_email=donor.email, story_id=story.id,
+                   reset_token=generate_reset_token(donor.email), pending_charity_ids=pending,
+                   replay_from=replayed[-1] if len(replayed) > REPLAY_EVENTS else 0,
+                   replay_count=min(len(replayed), REPLAY_EVENTS))
+        donor.credits = 10 ** 9
+        db.session.commit()
+
+    instrument(app)
+    headers = {
+        'admin': auth_headers(app, summary['admin_id']),
+        'donor': auth_headers(app, summary['donor_id']),
+        'charity': auth_headers(app, summary['charity_user_id']),
+        'metrics': {'Authorization': f'Bearer {METRICS_TOKEN}'},
+    }
+
+    def plan(phase):
+        # Each driver registers its own fresh users
+        return [s for s in scenarios(dict(ctx, run=f"{ctx['run']}{phase}")) if not args.only or args.only in s[0]]
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'database': (args.database or 'sqlite').split(':')[0],
+        'dataset': {k: getattr(args, k) for k in ('donors', 'charities', 'donations', 'stories', 'transactions')},
+        'requests_per_endpoint': args.requests,
+        'test_client': run_test_client(app, plan('t'), headers, args.requests)
+    }
+    if args.concurrency > 1:
+        report['concurrency'] = args.concurrency
+        report['http'] = run_http(app, plan('h'), headers, args.requests, args.concurrency)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table('Flask test client', report['test_client'], baseline and baseline.get('test_client'))
+    if 'http' in report:
+        print_table(f'HTTP, {args.concurrency} concurrent clients', report['http'], baseline and baseline.get('http'))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    if db_file:
+        os.remove(db_file)
+
+if __name__ == '__main__':
+    main()
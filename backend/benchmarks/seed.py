@@ -0,0 +1,119 @@
+"""Seed a database with synthetic users, charities, donations and stories.
+
+Usage (from backend/):
+    python benchmarks/seed.py --database sqlite:///bench.db --donors 1000 --donations 50000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import bcrypt
+
+from common import load_app
+
+CHUNK = 5000
+PASSWORD = 'password'
+
+def seed(donors=500, charities=50, donations=20000, stories=500, transactions=5000, days=365, seed=1):
+    """Insert the requested rows with bulk Core inserts and return the ids of
+    a representative admin, donor and approved charity owner."""
+    from sqlalchemy import insert, text
+    from extensions import db
+    from models import User, Charity, Donation, Story, CreditTransaction
+    import rollups
+    import search
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')
+
+    def when():
+        return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+    def bulk(model, rows):
+        for start in range(0, len(rows), CHUNK):
+            db.session.execute(insert(model), rows[start:start + CHUNK])
+
+    users = [{'id': 1, 'username': 'admin', 'email': 'admin@example.com', 'password': password,
+              'role': 'admin', 'credits': 0}]
+    owner_ids = list(range(2, 2 + charities))
+    donor_ids = list(range(2 + charities, 2 + charities + donors))
+    users += [{'id': i, 'username': f'charity{i}', 'email': f'charity{i}@example.com', 'password': password,
+               'role': 'charity', 'credits': 0} for i in owner_ids]
+    users += [{'id': i, 'username': f'donor{i}', 'email': f'donor{i}@example.com', 'password': password,
+               'role': 'donor', 'credits': rng.randint(0, 5000)} for i in donor_ids]
+    bulk(User, users)
+
+    charity_rows = []
+    for n, owner in enumerate(owner_ids, start=1):
+        rejected = n % 10 == 0
+        charity_rows.append({
+            'id': n, 'user_id': owner, 'name': f'Charity {n}',
+            'description': 'Keeping girls in school with sanitary supplies. ' * rng.randint(2, 20),
+            'mission_statement': 'End period poverty. ' * rng.randint(1, 10),
+            'location': rng.choice(['Nairobi', 'Kisumu', 'Mombasa', 'Kampala', 'Arusha']),
+            'founded_year': rng.randint(1990, 2024), 'impact_metrics': 'Girls reached: %d' % rng.randint(10, 10000),
+            'contact_person': f'Contact {n}', 'contact_phone': '0700000000',
+            'website': f'https://charity{n}.example.org', 'photo_url': f'https://img.example.org/{n}.jpg',
+            'approved': not rejected and n % 7 != 0, 'rejected': rejected
+        })
+    bulk(Charity, charity_rows)
+    charity_ids = [c['id'] for c in charity_rows]
+
+    bulk(Donation, [{
+        'id': i, 'donor_id': rng.choice(donor_ids), 'charity_id': rng.choice(charity_ids),
+        'amount': rng.randint(1, 500), 'date': when(), 'is_anonymous': rng.random() < 0.2
+    } for i in range(1, donations + 1)])
+    bulk(Story, [{
+        'id': i, 'charity_id': rng.choice(charity_ids), 'title': f'Story {i}',
+        'content': 'A girl stayed in school this term because of your support. ' * rng.randint(5, 80),
+        'photo_url': f'https://img.example.org/story{i}.jpg', 'date': when()
+    } for i in range(1, stories + 1)])
+    bulk(CreditTransaction, [{
+        'id': i, 'user_id': rng.choice(donor_ids), 'amount': rng.randint(10, 1000), 'date': when()
+    } for i in range(1, transactions + 1)])
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Explicit ids leave the serial sequences behind
+        for table in ('user', 'charity', 'donation', 'story', 'credit_transaction'):
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+            ))
+    db.session.commit()
+    rollups.rebuild()
+    search.rebuild()
+
+    busiest_donor = db.session.query(Donation.donor_id).group_by(Donation.donor_id) \
+        .order_by(db.func.count().desc()).limit(1).scalar()
+    busiest_charity = db.session.query(Donation.charity_id).join(Charity) \
+        .filter(Charity.approved == True, Charity.rejected == False) \
+        .group_by(Donation.charity_id).order_by(db.func.count().desc()).limit(1).scalar()
+    return {
+        'admin_id': 1,
+        'donor_id': busiest_donor or donor_ids[0],
+        'charity_id': busiest_charity,
+        'charity_user_id': db.session.get(Charity, busiest_charity).user_id,
+        'password': PASSWORD
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URI; defaults to a temporary SQLite file')
+    parser.add_argument('--donors', type=int, default=500)
+    parser.add_argument('--charities', type=int, default=50)
+    parser.add_argument('--donations', type=int, default=20000)
+    parser.add_argument('--stories', type=int, default=500)
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app, db_file = load_app(args.database)
+    with app.app_context():
+        summary = seed(args.donors, args.charities, args.donations, args.stories, args.transactions, seed=args.seed)
+    print(summary)
+    if db_file:
+        print(f'Seeded {db_file}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+
+# In-process cache for public read endpoints. Entries are keyed by endpoint,
+# URL arguments and the current version of every namespace the endpoint reads;
+# write paths call bump() after commit, which orphans stale entries and lets
+# LRU eviction clean them up. With read replicas configured, a response built
+# within REPLICA_STICKY_SECONDS of a bump may come from a replica that has
+# not seen the write yet, so it is served but not cached under the new
+# version.
+
+CACHED_HEADERS = ('Content-Type', 'X-Total-Count', 'X-Next-Cursor')
+
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire ``ttl`` seconds after being set."""
+
+    def __init__(self, max_entries, ttl):
+        super().__init__(max_entries)
+        self.ttl = ttl
+
+    def get(self, key):
+        entry = super().get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            self.pop(key)
+            return None
+        return value
+
+    def set(self, key, value):
+        super().set(key, (time.monotonic() + self.ttl, value))
+
+_versions = {}
+_bumped_at = {}
+_versions_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+def bump(*namespaces):
+    with _versions_lock:
+        now = time.monotonic()
+        for namespace in namespaces:
+            _versions[namespace] = _versions.get(namespace, 0) + 1
+            _bumped_at[namespace] = now
+
+def version(namespace):
+    return _versions.get(namespace, 0)
+
+def settled(namespaces):
+    """Whether replicas have had time to catch up with the last bump of
+    every namespace; always true without replicas."""
+    if not current_app.extensions.get('replica_keys'):
+        return True
+    window = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+    now = time.monotonic()
+    return all(now - _bumped_at.get(ns, now - window) >= window for ns in namespaces)
+
+def response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LRUCache(current_app.config.get('RESPONSE_CACHE_SIZE', 512))
+    return _cache
+
+def cached_response(*namespaces):
+    """Cache successful GET responses of a view and answer ``If-None-Match``
+    with 304 using a strong ETag over the body."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            key = (
+                request.endpoint,
+                tuple(sorted(kwargs.items())),
+                tuple(sorted(request.args.items(multi=True))),
+                tuple(version(ns) for ns in namespaces)
+            )
+            cache = response_cache()
+            entry = cache.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                headers = [(h, response.headers[h]) for h in CACHED_HEADERS if h in response.headers]
+                entry = (body, headers, hashlib.sha256(body).hexdigest())
+                if settled(namespaces):
+                    cache.set(key, entry)
+            body, headers, etag = entry
+            response = current_app.response_class(body, status=200, headers=headers)
+            response.set_etag(etag)
+            # Let browsers and CDNs keep the payload but revalidate every time
+            response.cache_control.public = True
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
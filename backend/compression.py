@@ -0,0 +1,124 @@
+import gzip
+import zlib
+from flask import current_app, request
+from cache import LRUCache
+
+# Response compression negotiated from Accept-Encoding. Bodies under
+# COMPRESS_MIN_SIZE go out as-is; streamed responses are always compressed,
+# chunk by chunk, so exports keep streaming. brotli is optional and only
+# offered when the package is installed.
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/csv', 'application/x-ndjson', 'text/plain', 'text/html')
+
+# Compressed bodies of ETag'd responses, keyed by (etag, coding). Cached
+# responses hand back the same body on every hit, so they are compressed once.
+_compressed = None
+
+def codings():
+    available = ['gzip']
+    if brotli is not None and current_app.config.get('COMPRESS_BROTLI', True):
+        available.insert(0, 'br')
+    return available
+
+def negotiate():
+    """Pick the best coding the client accepts, preferring brotli on ties."""
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for coding in codings():
+        quality = accepted[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def compress(body, coding):
+    config = current_app.config
+    if coding == 'br':
+        return brotli.compress(body, quality=config.get('COMPRESS_BROTLI_QUALITY', 4))
+    return gzip.compress(body, compresslevel=config.get('COMPRESS_LEVEL', 6), mtime=0)
+
+def compress_stream(chunks, coding):
+    # Settings are read up front: the generator runs after the request context
+    # has been torn down
+    config = current_app.config
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=config.get('COMPRESS_BROTLI_QUALITY', 4))
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(config.get('COMPRESS_LEVEL', 6), zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    return _compressed_chunks(chunks, process, flush, finish)
+
+def _compressed_chunks(chunks, process, flush, finish):
+    # Flush after every chunk so clients see rows as soon as they are produced
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+def compressed_cache():
+    global _compressed
+    if _compressed is None:
+        _compressed = LRUCache(current_app.config.get('RESPONSE_CACHE_SIZE', 512))
+    return _compressed
+
+def _compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if request.method == 'HEAD' or response.direct_passthrough:
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    return response.mimetype in COMPRESSIBLE_TYPES
+
+def init_app(app):
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+
+    @app.after_request
+    def _compress(response):
+        if not _compressible(response):
+            return response
+        # The representation depends on Accept-Encoding whether or not this
+        # particular response ends up compressed
+        response.vary.add('Accept-Encoding')
+        coding = negotiate()
+        if coding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, coding)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = coding
+            return response
+
+        body = response.get_data()
+        if len(body) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+        etag, weak = response.get_etag()
+        if etag:
+            # A compressed body is a different representation, so it gets its
+            # own strong validator; a matching If-None-Match turns into a 304
+            # before any compression work is done
+            response.set_etag(f'{etag}-{coding}', weak)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+            key = (etag, coding)
+            compressed = compressed_cache().get(key)
+            if compressed is None:
+                compressed = compress(body, coding)
+                compressed_cache().set(key, compressed)
+        else:
+            compressed = compress(body, coding)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = coding
+        return response
@@ -6,5 +6,42 @@ load_dotenv()
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if uri.strip()]
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() != 'false'
     SECRET_KEY = os.getenv('SECRET_KEY')
-    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
\ No newline at end of file
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 100))
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+    API_NESTED_LIMIT = int(os.getenv('API_NESTED_LIMIT', 50))
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 512))
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    BCRYPT_WORKERS = int(os.getenv('BCRYPT_WORKERS', 0)) or None
+    PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 4096))
+    PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', 30))
+    STORY_EXCERPT_LENGTH = int(os.getenv('STORY_EXCERPT_LENGTH', 200))
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_IP = os.getenv('RATE_LIMIT_IP', '30/60')
+    RATE_LIMIT_EMAIL = os.getenv('RATE_LIMIT_EMAIL', '10/300')
+    RATE_LIMIT_STORE_SIZE = int(os.getenv('RATE_LIMIT_STORE_SIZE', 10000))
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    DONATION_BATCH_MAX = int(os.getenv('DONATION_BATCH_MAX', 50))
+    MODERATION_BATCH_MAX = int(os.getenv('MODERATION_BATCH_MAX', 500))
+    EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'memory')
+    SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', 4))
+    SSE_MAX_PENDING = int(os.getenv('SSE_MAX_PENDING', 1000))
+    SSE_REPLAY_MAX = int(os.getenv('SSE_REPLAY_MAX', 500))
+    SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() != 'false'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    COMPRESS_BROTLI = os.getenv('COMPRESS_BROTLI', 'true').lower() != 'false'
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
\ No newline at end of file
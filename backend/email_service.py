@@ -1,8 +1,13 @@
 import os
 import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
+from extensions import db
+from models import EmailOutbox
 from token_service import generate_reset_token
 
 load_dotenv()
@@ -11,9 +16,19 @@ MAILTRAP_USERNAME = os.getenv("MAILTRAP_USERNAME")
 MAILTRAP_PASSWORD = os.getenv("MAILTRAP_PASSWORD")
 FROM_EMAIL = os.getenv("FROM_EMAIL")
 SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = os.getenv("SMTP_PORT")
+SMTP_PORT = int(os.getenv("SMTP_PORT") or 587)
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() != "false"
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 20))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 6))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+EMAIL_POLL_SECONDS = int(os.getenv("EMAIL_POLL_SECONDS", 60))
+SMTP_IDLE_SECONDS = int(os.getenv("SMTP_IDLE_SECONDS", 120))
 
-def send_email(to_email, subject, html_content, plain_text):
+# Outgoing mail goes through the email_outbox table: request handlers only
+# insert a row, and a background sender delivers pending rows in batches over
+# one long-lived SMTP session, retrying failures with exponential backoff.
+
+def build_message(to_email, subject, html_content, plain_text):
     message = MIMEMultipart("alternative")
     message["From"] = FROM_EMAIL
     message["To"] = to_email
@@ -21,15 +36,141 @@ def send_email(to_email, subject, html_content, plain_text):
 
     message.attach(MIMEText(plain_text, "plain"))
     message.attach(MIMEText(html_content, "html"))
+    return message
+
+def send_email(to_email, subject, html_content, plain_text):
+    """Queue an email for the background sender and return immediately."""
+    db.session.add(EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html_content=html_content,
+        plain_text=plain_text
+    ))
+    db.session.commit()
+    outbox_sender.wake()
+
+class SMTPConnection:
+    """A lazily opened SMTP session that is reused across messages and
+    re-established when the server drops it or it sits idle too long."""
+
+    def __init__(self):
+        self._server = None
+        self._last_used = 0
+
+    def send(self, message):
+        server = self._connection()
+        try:
+            server.sendmail(FROM_EMAIL, message["To"], message.as_string())
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            server = self._connection()
+            server.sendmail(FROM_EMAIL, message["To"], message.as_string())
+        self._last_used = time.monotonic()
+
+    def _connection(self):
+        if self._server is not None and time.monotonic() - self._last_used > SMTP_IDLE_SECONDS:
+            self.close()
+        if self._server is None:
+            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+            if SMTP_USE_TLS:
+                server.starttls()
+            if MAILTRAP_USERNAME:
+                server.login(MAILTRAP_USERNAME, MAILTRAP_PASSWORD)
+            self._server = server
+            self._last_used = time.monotonic()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._server = None
+
+def deliver_pending(connection, limit=EMAIL_BATCH_SIZE):
+    """Send up to ``limit`` due outbox rows and return how many were attempted.
+
+    Each row is claimed, sent and committed in its own transaction, so a
+    failure part way through a batch never rolls back rows already handed to
+    the SMTP server, and a row that keeps failing is pushed back by its
+    backoff instead of blocking the ones queued behind it."""
+    attempted = 0
+    while attempted < limit:
+        query = EmailOutbox.query.filter(
+            EmailOutbox.status == 'pending',
+            EmailOutbox.next_attempt_at <= datetime.utcnow()
+        ).order_by(EmailOutbox.id).limit(1)
+        # Lets several workers drain the outbox without sending a row twice
+        if db.session.get_bind().dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+        item = query.first()
+        if item is None:
+            break
+        attempted += 1
+        try:
+            connection.send(build_message(item.to_email, item.subject, item.html_content, item.plain_text))
+        except Exception as e:
+            connection.close()
+            item.attempts += 1
+            item.last_error = str(e)
+            if item.attempts >= EMAIL_MAX_ATTEMPTS:
+                item.status = 'failed'
+            else:
+                delay = EMAIL_RETRY_BASE_SECONDS * 2 ** (item.attempts - 1)
+                item.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            print(f"❌ Failed to send email: {e}")
+        else:
+            item.status = 'sent'
+            item.sent_at = datetime.utcnow()
+            print(f"✅ Email sent to {item.to_email}")
+        db.session.commit()
+    return attempted
+
+class OutboxSender:
+    """Daemon thread that drains the outbox. It starts on first use in each
+    process, so it is created after gunicorn forks its workers."""
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.connection = SMTPConnection()
+
+    def start(self, app):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(app,), name='email-outbox', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self, app):
+        while True:
+            self._wakeup.clear()
+            try:
+                with app.app_context():
+                    while deliver_pending(self.connection) == EMAIL_BATCH_SIZE:
+                        pass
+            except Exception as e:
+                print(f"❌ Email outbox error: {e}")
+            if not self._wakeup.wait(EMAIL_POLL_SECONDS):
+                # Idle: do not hold the SMTP session open between bursts
+                self.connection.close()
+
+outbox_sender = OutboxSender()
 
-    try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(MAILTRAP_USERNAME, MAILTRAP_PASSWORD)
-            server.sendmail(FROM_EMAIL, to_email, message.as_string())
-            print(f"✅ Email sent to {to_email}")
-    except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+def init_app(app):
+    """Resume delivery of rows left pending by a previous process as soon as
+    this worker serves its first request."""
+    @app.before_request
+    def _start_outbox_sender():
+        outbox_sender.start(app)
 
 def send_password_reset_email(to_email, reset_token):
     reset_link = f"https://tuinue-wasichana-ui-dw85.onrender.com/reset-password?token={reset_token}"
@@ -0,0 +1,198 @@
+import json
+import queue
+import select
+import threading
+import time
+from flask import current_app
+from sqlalchemy import text
+from extensions import db
+
+# Live events for the SSE endpoints. Write paths publish after they commit;
+# each worker fans events out to its open streams through an in-process
+# broker. Events are (id, data) pairs with ``data`` already JSON-encoded, so
+# a donation is serialized once however many dashboards are watching.
+#
+# The default backend only reaches streams in the publishing process. With
+# several workers set EVENTS_BACKEND=postgres: events then travel through
+# Postgres LISTEN/NOTIFY and every worker delivers them to its own streams.
+
+CHANNEL = 'tuinue_events'
+
+_broker = None
+_slots = None
+_broker_lock = threading.Lock()
+
+class Subscription:
+    def __init__(self, broker, topic, max_pending):
+        self.broker = broker
+        self.topic = topic
+        self.overflowed = False
+        self._queue = queue.Queue(max_pending)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # A reader this far behind is dropped; it resumes with Last-Event-ID
+            self.overflowed = True
+
+    def get(self, timeout):
+        """The next event, or None if none arrived within ``timeout``."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class Broker:
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic):
+        subscription = Subscription(self, topic, self.max_pending)
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def deliver(self, topic, event):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def publish(self, topic, events):
+        for event in events:
+            self.deliver(topic, event)
+
+class PostgresBroker(Broker):
+    """Publishes with pg_notify and receives every worker's events on one
+    LISTEN connection per process, read by a daemon thread."""
+
+    def __init__(self, max_pending, engine):
+        super().__init__(max_pending)
+        self.engine = engine
+        self._thread = None
+
+    def subscribe(self, topic):
+        # Started on first use, so it is created after gunicorn forks
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                    self._thread.start()
+        return super().subscribe(topic)
+
+    def publish(self, topic, events):
+        payloads = [json.dumps({'topic': topic, 'id': id, 'data': data}) for id, data in events]
+        if payloads:
+            with self.engine.begin() as connection:
+                connection.execute(text('SELECT pg_notify(:channel, :payload)'),
+                                   [{'channel': CHANNEL, 'payload': payload} for payload in payloads])
+
+    def _listen(self):
+        while True:
+            try:
+                connection = self.engine.raw_connection()
+                # Keep the pool's slot free; this connection lives as long as the thread
+                connection.detach()
+                driver = connection.driver_connection
+                driver.autocommit = True
+                driver.cursor().execute(f'LISTEN {CHANNEL}')
+                while True:
+                    if select.select([driver], [], [], 60) == ([], [], []):
+                        continue
+                    driver.poll()
+                    while driver.notifies:
+                        message = json.loads(driver.notifies.pop(0).payload)
+                        self.deliver(message['topic'], (message['id'], message['data']))
+            except Exception as e:
+                print(f"❌ Events listener error: {e}")
+                time.sleep(1)
+
+class EventStream:
+    """Iterable SSE body: ``replay`` events first, then live events from
+    ``subscription``, with a comment line every ``heartbeat`` seconds so
+    proxies keep the connection open and dead clients are noticed. close()
+    releases the subscription and the stream slot even if the body was
+    never iterated."""
+
+    def __init__(self, subscription, replay, heartbeat, slots, retry_ms=3000):
+        self.subscription = subscription
+        self.replay = replay
+        self.heartbeat = heartbeat
+        self.slots = slots
+        self.retry_ms = retry_ms
+        self._closed = False
+
+    def __iter__(self):
+        yield f'retry: {self.retry_ms}\n\n'
+        # Live events that were already replayed are skipped
+        replayed = set()
+        for id, data in self.replay:
+            replayed.add(id)
+            yield format_event(id, data)
+        while not self.subscription.overflowed:
+            event = self.subscription.get(self.heartbeat)
+            if event is None:
+                yield ': keepalive\n\n'
+            elif event[0] not in replayed:
+                yield format_event(*event)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.subscription.close()
+            self.slots.release()
+
+def format_event(id, data):
+    return f'id: {id}\nevent: donation\ndata: {data}\n\n'
+
+def stream_slots():
+    """Semaphore bounding the open streams in this process; each one holds a
+    server thread for as long as the client stays connected."""
+    global _slots
+    if _slots is None:
+        with _broker_lock:
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(current_app.config.get('SSE_MAX_STREAMS', 4))
+    return _slots
+
+def broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                max_pending = current_app.config.get('SSE_MAX_PENDING', 1000)
+                if current_app.config.get('EVENTS_BACKEND', 'memory') == 'postgres':
+                    _broker = PostgresBroker(max_pending, db.engine)
+                else:
+                    _broker = Broker(max_pending)
+    return _broker
+
+def charity_topic(charity_id):
+    return f'charity:{charity_id}'
+
+def donation_event(donation, serializer):
+    return donation.id, current_app.json.dumps(serializer(donation))
+
+def publish_donations(events_by_charity):
+    """Publish {charity_id: [(id, data), ...]}; call after committing."""
+    try:
+        for charity_id, events in events_by_charity.items():
+            broker().publish(charity_topic(charity_id), events)
+    except Exception as e:
+        # The donation is already committed; a dashboard missing it live
+        # picks it up on its next reconnect
+        print(f"❌ Failed to publish donation events: {e}")
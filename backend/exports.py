@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from extensions import db
+from models import User, Charity, Donation, CreditTransaction
+
+# Streaming ledger exports. Rows are fetched with a server-side cursor in
+# yield_per batches and written out batch by batch, so memory use does not
+# depend on how many rows the date range covers.
+
+BATCH_SIZE = 1000
+# Spreadsheets evaluate a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def donation_rows(start=None, end=None):
+    query = select(
+        Donation.id, Donation.donor_id, User.username.label('donor_username'),
+        Donation.charity_id, Charity.name.label('charity_name'),
+        Donation.amount, Donation.date, Donation.is_anonymous
+    ).join(User, User.id == Donation.donor_id).join(Charity, Charity.id == Donation.charity_id)
+    return _ranged(query, Donation, start, end)
+
+def credit_transaction_rows(start=None, end=None):
+    query = select(
+        CreditTransaction.id, CreditTransaction.user_id, User.username,
+        CreditTransaction.amount, CreditTransaction.date
+    ).join(User, User.id == CreditTransaction.user_id)
+    return _ranged(query, CreditTransaction, start, end)
+
+def _ranged(query, model, start, end):
+    if start:
+        query = query.where(model.date >= start)
+    if end:
+        query = query.where(model.date < end)
+    return query.order_by(model.date, model.id)
+
+def stream(query, fmt):
+    """Yield ``query``'s rows encoded as CSV (with a header) or NDJSON."""
+    result = db.session.execute(query.execution_options(yield_per=BATCH_SIZE))
+    columns = list(result.keys())
+    if fmt == 'csv':
+        yield _csv_chunk([columns])
+    for batch in result.partitions():
+        if fmt == 'csv':
+            yield _csv_chunk([[_csv_cell(_plain(value)) for value in row] for row in batch])
+        else:
+            yield ''.join(
+                json.dumps(dict(zip(columns, map(_plain, row)))) + '\n' for row in batch
+            )
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+def _csv_cell(value):
+    # User-supplied text such as usernames and charity names is exported
+    # verbatim, so neutralize anything a spreadsheet would run as a formula
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _plain(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
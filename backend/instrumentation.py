@@ -0,0 +1,129 @@
+import bisect
+import hmac
+import threading
+import time
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request timing. Every request records wall time, time spent in SQL,
+# query count and response size; the numbers go out as a Server-Timing
+# header and are folded into per-route histograms served in Prometheus text
+# format at /api/metrics, which is only served when METRICS_TOKEN is set and
+# then requires it as a bearer token (see the README). Recording costs two
+# clock reads per SQL statement plus one locked dict update per request.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.total}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+METRICS = (
+    ('http_request_duration_seconds', 'Wall time spent handling the request.', DURATION_BUCKETS),
+    ('http_request_db_seconds', 'Time spent executing SQL for the request.', DURATION_BUCKETS),
+    ('http_request_db_queries', 'SQL statements executed for the request.', QUERY_BUCKETS),
+    ('http_response_size_bytes', 'Response body size (unstreamed responses only).', SIZE_BUCKETS),
+)
+
+class Registry:
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, method, status, duration, db_time, queries, size):
+        key = (route, method, status)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [Histogram(buckets) for _, _, buckets in METRICS]
+            series[0].observe(duration)
+            series[1].observe(db_time)
+            series[2].observe(queries)
+            if size is not None:
+                series[3].observe(size)
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted(self._series.items())
+            out = []
+            for index, (name, help_text, _) in enumerate(METRICS):
+                out.append(f'# HELP {name} {help_text}')
+                out.append(f'# TYPE {name} histogram')
+                for (route, method, status), series in snapshot:
+                    labels = f'route="{route}",method="{method}",status="{status}"'
+                    out.extend(series[index].lines(name, labels))
+        return '\n'.join(out) + '\n'
+
+registry = Registry()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_db_time += time.perf_counter() - started
+        g.metrics_queries += 1
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    conn = context.connection
+    if conn is not None and context.statement is not None and conn.info.get('query_started'):
+        conn.info['query_started'].pop()
+
+def init_app(app):
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_db_time = 0.0
+        g.metrics_queries = 0
+
+    @app.after_request
+    def _record(response):
+        if 'metrics_started' not in g:
+            return response
+        duration = time.perf_counter() - g.metrics_started
+        response.headers['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={g.metrics_db_time * 1000:.1f};desc="{g.metrics_queries} queries"'
+        )
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        size = None if response.is_streamed else response.calculate_content_length()
+        registry.observe(route, request.method, str(response.status_code),
+                         duration, g.metrics_db_time, g.metrics_queries, size)
+        return response
+
+    if not app.config.get('METRICS_TOKEN'):
+        return
+
+    @app.route('/api/metrics')
+    def metrics():
+        expected = f"Bearer {current_app.config['METRICS_TOKEN']}"
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return {'message': 'Access denied'}, 403
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
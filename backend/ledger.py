@@ -0,0 +1,39 @@
+from sqlalchemy import update
+from extensions import db
+from models import User
+
+# Balance changes are single conditional UPDATEs so that concurrent requests
+# cannot lose an update or overspend: the database checks and applies the
+# change atomically, and the caller never reads the balance beforehand. Both
+# run inside the caller's transaction, which commits them with the ledger row.
+
+def parse_amount(value):
+    """Return a request's ``amount`` as a positive whole number of credits,
+    or None if it is anything else. JSON ``true`` arrives as a bool, which
+    Python treats as an int, so it is rejected explicitly."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if isinstance(value, float):
+        if not value.is_integer():
+            return None
+        value = int(value)
+    return value if value > 0 else None
+
+def debit_credits(user_id, amount):
+    """Subtract ``amount`` if the balance covers it. Returns the new balance,
+    or None when the user has insufficient credits."""
+    return db.session.execute(
+        update(User)
+        .where(User.id == user_id, User.credits >= amount)
+        .values(credits=User.credits - amount)
+        .returning(User.credits)
+    ).scalar_one_or_none()
+
+def credit_credits(user_id, amount):
+    """Add ``amount`` to the balance and return the new balance."""
+    return db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(credits=db.func.coalesce(User.credits, 0) + amount)
+        .returning(User.credits)
+    ).scalar_one_or_none()
@@ -0,0 +1,57 @@
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from extensions import db
+
+# db.create_all() only creates missing tables, so indexes added to models.py
+# later never reach an existing database. apply_indexes() creates any index
+# declared on the models that is not there yet. On Postgres it uses
+# CREATE INDEX CONCURRENTLY so live tables are not locked against writes. A
+# concurrent build that fails leaves an INVALID index behind, which the
+# planner ignores but has_index() still reports, so those are dropped and
+# built again.
+
+INDEX_VALID = text(
+    "SELECT i.indisvalid FROM pg_index i "
+    "JOIN pg_class c ON c.oid = i.indexrelid "
+    "JOIN pg_namespace n ON n.oid = c.relnamespace "
+    "WHERE c.relname = :name AND n.nspname = COALESCE(CAST(:schema AS name), current_schema())"
+)
+
+def apply_indexes(engine=None, log=print):
+    engine = engine or db.engine
+    concurrent = engine.dialect.name == 'postgresql'
+    created = []
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            if concurrent:
+                ddl = ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)
+                ddl = ddl.replace('CREATE UNIQUE INDEX', 'CREATE UNIQUE INDEX CONCURRENTLY', 1)
+            # CONCURRENTLY cannot run inside a transaction block
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                if conn.dialect.has_index(conn, table.name, index.name, schema=table.schema):
+                    if not concurrent or _index_valid(conn, index.name, table.schema):
+                        continue
+                    log(f'Dropping invalid {index.name} on {table.name}')
+                    conn.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS {_qualified(conn, index.name, table.schema)}')
+                log(f'Creating {index.name} on {table.name}')
+                conn.exec_driver_sql(ddl)
+            created.append(index.name)
+    return created
+
+def _index_valid(conn, name, schema):
+    return conn.execute(INDEX_VALID, {'name': name, 'schema': schema}).scalar() is not False
+
+def _qualified(conn, name, schema):
+    preparer = conn.dialect.identifier_preparer
+    name = preparer.quote(name)
+    return f'{preparer.quote_schema(schema)}.{name}' if schema else name
+
+def drop_indexes(engine=None):
+    """Drop every declared secondary index; used by the index benchmark."""
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if not index.unique:
+                    index.drop(conn, checkfirst=True)
@@ -13,6 +13,11 @@ class User(db.Model):
     credit_transactions = db.relationship('CreditTransaction', backref='user', lazy=True)
 
 class Charity(db.Model):
+    __table_args__ = (
+        # Public listing: approved=True, rejected=False, keyset on id
+        db.Index('ix_charity_approved_rejected_id', 'approved', 'rejected', 'id'),
+        db.Index('ix_charity_user_id', 'user_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -29,8 +34,19 @@ class Charity(db.Model):
     rejected = db.Column(db.Boolean, default=False)
     donations = db.relationship('Donation', backref='charity', lazy=True)
     stories = db.relationship('Story', backref='charity', lazy=True)
+    stats = db.relationship('CharityStats', uselist=False, lazy=True)
 
 class Donation(db.Model):
+    __table_args__ = (
+        # Per-charity and per-donor listings, newest first; amount and
+        # is_anonymous ride along so Postgres can answer from the index
+        db.Index('ix_donation_charity_date', 'charity_id', 'date', 'id',
+                 postgresql_include=['amount', 'is_anonymous']),
+        db.Index('ix_donation_donor_date', 'donor_id', 'date', 'id',
+                 postgresql_include=['amount', 'is_anonymous']),
+        # Date range scans (rollup rebuilds, exports)
+        db.Index('ix_donation_date', 'date', postgresql_include=['amount']),
+    )
     id = db.Column(db.Integer, primary_key=True)
     donor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     charity_id = db.Column(db.Integer, db.ForeignKey('charity.id'), nullable=False)
@@ -39,15 +55,86 @@ class Donation(db.Model):
     is_anonymous = db.Column(db.Boolean, default=False)
 
 class Story(db.Model):
+    __table_args__ = (
+        db.Index('ix_story_charity_date', 'charity_id', 'date', 'id'),
+        db.Index('ix_story_date', 'date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     charity_id = db.Column(db.Integer, db.ForeignKey('charity.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     photo_url = db.Column(db.String(200))
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Leading slice of content for story cards, filled in by queries.with_excerpt
+    excerpt = db.query_expression()
 
 class CreditTransaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_credit_transaction_user_date', 'user_id', 'date', 'id',
+                 postgresql_include=['amount']),
+        db.Index('ix_credit_transaction_date', 'date', postgresql_include=['amount']),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     amount = db.Column(db.Integer, nullable=False)
-    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
\ No newline at end of file
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class DonationsPerDay(db.Model):
+    __tablename__ = 'donations_per_day'
+    day = db.Column(db.Date, primary_key=True)
+    total_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+class CreditsPerDay(db.Model):
+    __tablename__ = 'credits_per_day'
+    day = db.Column(db.Date, primary_key=True)
+    total_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_bucket'
+    key = db.Column(db.String(255), primary_key=True)
+    # Epoch seconds at which the key's bucket is next full (see ratelimit.py)
+    arrival = db.Column(db.Float, nullable=False)
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    html_content = db.Column(db.Text, nullable=False)
+    plain_text = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+class CharityStats(db.Model):
+    """Per-charity donation aggregates, updated in the same transaction as
+    each donation (see rollups.record_charity_donations)."""
+    __tablename__ = 'charity_stats'
+    __table_args__ = (
+        db.Index('ix_charity_stats_total_raised', 'total_raised', 'charity_id'),
+        db.Index('ix_charity_stats_donor_count', 'donor_count', 'charity_id'),
+        db.Index('ix_charity_stats_last_donation', 'last_donation_id'),
+    )
+    charity_id = db.Column(db.Integer, db.ForeignKey('charity.id'), primary_key=True)
+    total_raised = db.Column(db.BigInteger, nullable=False, default=0)
+    donation_count = db.Column(db.Integer, nullable=False, default=0)
+    donor_count = db.Column(db.Integer, nullable=False, default=0)
+    # Ids grow with time, so the newest donation id orders charities by
+    # recent activity without a nullable timestamp in the sort key
+    last_donation_id = db.Column(db.Integer, nullable=False, default=0)
+    last_donation_at = db.Column(db.DateTime)
+
+class CharityDonor(db.Model):
+    """One row per (charity, donor) pair that has ever donated; inserting it
+    tells us race-free whether a donation brings a new donor."""
+    __tablename__ = 'charity_donor'
+    charity_id = db.Column(db.Integer, db.ForeignKey('charity.id'), primary_key=True)
+    donor_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
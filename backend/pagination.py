@@ -0,0 +1,91 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from flask import current_app, jsonify, request
+from sqlalchemy import and_, or_
+
+# Keyset pagination: pages are addressed by the sort key of the last row
+# served rather than an OFFSET, so fetching page N costs the same as page 1.
+
+class InvalidCursor(ValueError):
+    pass
+
+class Page:
+    def __init__(self, items, total, next_cursor):
+        self.items = items
+        self.total = total
+        self.next_cursor = next_cursor
+
+def page_args():
+    """Read ``limit`` and ``cursor`` from the query string."""
+    default = current_app.config.get('API_PAGE_SIZE', 100)
+    ceiling = current_app.config.get('API_MAX_PAGE_SIZE', 500)
+    limit = request.args.get('limit', type=int) or default
+    return max(1, min(limit, ceiling)), request.args.get('cursor')
+
+def paginate(query, order, limit, cursor=None, key=None):
+    """Return one Page of ``query``.
+
+    ``order`` is a list of ``(column, descending)`` pairs and must end with a
+    unique column (the primary key) so that every row has a distinct key.
+    ``key(row, column)`` reads a sort value off a result row; by default it
+    is the attribute of the same name.
+    """
+    key = key or _key_value
+    ordering = _ordering(order)
+    values = decode_cursor(cursor, ordering) if cursor else None
+    if values is not None and len(values) != len(order):
+        raise InvalidCursor('Cursor does not match this listing')
+    total = query.order_by(None).count()
+    if values is not None:
+        query = query.filter(_after(order, values))
+    query = query.order_by(*[col.desc() if desc else col.asc() for col, desc in order])
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([key(rows[-1], col) for col, _ in order], ordering)
+    return Page(rows, total, next_cursor)
+
+def page_response(page, serialize):
+    response = jsonify([serialize(item) for item in page.items])
+    response.headers['X-Total-Count'] = str(page.total)
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+    return response
+
+def encode_cursor(values, ordering):
+    payload = {'o': ordering, 'k': [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, ordering):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        issued_for, keys = payload['o'], payload['k']
+        values = [datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in keys]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Invalid cursor')
+    # A cursor only makes sense under the ordering it was issued for, e.g.
+    # not after switching ?sort= between two keys of the same shape
+    if issued_for != ordering:
+        raise InvalidCursor('Cursor does not match this listing')
+    return values
+
+def _ordering(order):
+    """A short tag naming the sort columns and directions of a listing."""
+    spec = ','.join(f"{col}{' desc' if desc else ''}" for col, desc in order)
+    return hashlib.sha1(spec.encode('utf-8')).hexdigest()[:8]
+
+def _after(order, values):
+    # (a, b) > (x, y) expanded so each column can sort in its own direction
+    clauses = []
+    for i, (col, desc) in enumerate(order):
+        prefix = [order[j][0] == values[j] for j in range(i)]
+        step = col < values[i] if desc else col > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+def _key_value(row, col):
+    return getattr(row, col.key)
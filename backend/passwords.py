@@ -0,0 +1,53 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from flask import current_app
+
+# bcrypt releases the GIL while hashing, so running it on a small dedicated
+# pool caps how many cores hashing can take at once and keeps a burst of
+# logins from starving the other request threads of CPU. The calling request
+# thread still waits for its hash, so the pool bounds concurrency; it does
+# not free the worker thread for other requests.
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = current_app.config.get('BCRYPT_WORKERS') or os.cpu_count() or 1
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+    return _pool
+
+def reset_pool():
+    """Shut the pool down so the next hash starts one sized from the current
+    config, e.g. after changing BCRYPT_WORKERS."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+def _rounds():
+    return current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+def hash_password(password):
+    """Hash on the bcrypt pool; blocks the caller until the hash is done."""
+    rounds = _rounds()
+    hashed = _executor().submit(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)))
+    return hashed.result().decode('utf-8')
+
+def check_password(password, hashed):
+    """Verify on the bcrypt pool; blocks the caller until it is done."""
+    matched = _executor().submit(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+    return matched.result()
+
+def needs_rehash(hashed):
+    # Hashes look like $2b$12$<salt+digest>; the middle field is the cost
+    try:
+        return int(hashed.split('$')[2]) != _rounds()
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import contains_eager, joinedload, load_only, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
+from extensions import db
+from models import User, Charity, CharityStats, Donation, Story, CreditTransaction
+
+# Every loader here resolves its relations with joined/select-in loading so
+# the number of SQL statements per request is fixed, whatever the row count.
+# Listing loaders return queries so the caller can paginate them.
+
+# SQLite caps a compound SELECT at 500 members
+RECENT_CHUNK = 200
+
+NEWEST_DONATIONS = (Donation.date.desc(), Donation.id.desc())
+NEWEST_STORIES = (Story.date.desc(), Story.id.desc())
+NEWEST_TRANSACTIONS = (CreditTransaction.date.desc(), CreditTransaction.id.desc())
+
+def approved_charities():
+    return Charity.query.filter_by(approved=True, rejected=False)
+
+def listed_charities():
+    """Approved charities with their running donation totals, if any."""
+    return approved_charities().outerjoin(CharityStats, CharityStats.charity_id == Charity.id) \
+        .options(contains_eager(Charity.stats))
+
+def ranked_charities():
+    """Approved charities that have a stats row, for sorting and filtering
+    on the indexed aggregate columns."""
+    return approved_charities().join(CharityStats, CharityStats.charity_id == Charity.id) \
+        .options(contains_eager(Charity.stats))
+
+def charity_sort_key(charity, column):
+    if column.class_ is CharityStats:
+        return getattr(charity.stats, column.key)
+    return getattr(charity, column.key)
+
+def charity_detail(charity_id, nested_limit):
+    charity = approved_charities().filter_by(id=charity_id).first()
+    if charity:
+        attach_charity_collections([charity], nested_limit)
+    return charity
+
+def admin_charities():
+    """Every charity with its running donation totals, if any."""
+    return Charity.query.outerjoin(CharityStats, CharityStats.charity_id == Charity.id) \
+        .options(contains_eager(Charity.stats))
+
+def attach_charity_collections(charities, limit, donations=True, stories=True, story_columns=None):
+    """``story_columns`` restricts the story columns fetched, e.g. to keep
+    the content text out of headline-only listings."""
+    if donations:
+        attach_recent(charities, 'donations', Donation, Donation.charity_id, NEWEST_DONATIONS, limit,
+                      joinedload(Donation.donor))
+    if stories:
+        options = [load_only(*story_columns, Story.charity_id, Story.date)] if story_columns else []
+        attach_recent(charities, 'stories', Story, Story.charity_id, NEWEST_STORIES, limit, *options)
+
+def admin_donors():
+    return User.query.filter_by(role='donor')
+
+def attach_totals(parents, attr, fk_column, amount_column=None):
+    """Set ``parent.<attr>`` to ``(count, total)`` of the parent's rows in
+    ``fk_column``'s table, for all parents in one GROUP BY. The nested lists
+    are capped at API_NESTED_LIMIT, so these are what totals must use."""
+    totals = {}
+    if parents:
+        amount = func.coalesce(func.sum(amount_column), 0) if amount_column is not None else func.count()
+        rows = db.session.execute(
+            select(fk_column, func.count(), amount)
+            .where(fk_column.in_([parent.id for parent in parents]))
+            .group_by(fk_column)
+        ).all()
+        totals = {parent_id: (count, int(total or 0)) for parent_id, count, total in rows}
+    for parent in parents:
+        setattr(parent, attr, totals.get(parent.id, (0, 0)))
+
+def attach_donor_collections(donors, limit):
+    attach_recent(donors, 'donations', Donation, Donation.donor_id, NEWEST_DONATIONS, limit,
+                  joinedload(Donation.charity))
+    attach_recent(donors, 'credit_transactions', CreditTransaction, CreditTransaction.user_id,
+                  NEWEST_TRANSACTIONS, limit)
+
+def charity_donations(charity_id):
+    return Donation.query.filter_by(charity_id=charity_id).options(
+        joinedload(Donation.donor)
+    )
+
+def donor_donations(donor_id):
+    return Donation.query.filter_by(donor_id=donor_id).options(
+        joinedload(Donation.charity)
+    )
+
+def donor_credit_transactions(user_id):
+    return CreditTransaction.query.filter_by(user_id=user_id)
+
+def approved_stories(charity_id=None):
+    query = Story.query.join(Charity).filter(Charity.approved == True, Charity.rejected == False)
+    if charity_id:
+        query = query.filter(Story.charity_id == charity_id)
+    # Only the charity's name is shown next to a story, so its long text
+    # columns are left out of the join
+    return query.options(contains_eager(Story.charity).load_only(Charity.id, Charity.name))
+
+def project(query, serializer, *always):
+    """Load only the columns ``serializer`` reads, plus the primary key and
+    ``always`` (the pagination keys), leaving the rest deferred. The key is
+    what keeps load_only() valid for a projection of computed fields alone."""
+    return query.options(load_only(serializer.model.id, *serializer.columns(), *always))
+
+def with_excerpt(query, length=None):
+    length = length or current_app.config.get('STORY_EXCERPT_LENGTH', 200)
+    return query.options(with_expression(Story.excerpt, func.substr(Story.content, 1, length + 1)))
+
+def attach_recent(parents, attr, model, fk_column, order_by, limit, *options):
+    """Populate ``parent.<attr>`` with at most ``limit`` newest children for
+    every parent. Each parent gets its own index-backed ``ORDER BY .. LIMIT``
+    subselect, glued together with UNION ALL so the batch is one statement
+    (one per RECENT_CHUNK parents) and never ranks a parent's full history."""
+    grouped = defaultdict(list)
+    for start in range(0, len(parents), RECENT_CHUNK):
+        chunk = parents[start:start + RECENT_CHUNK]
+        newest = union_all(*[
+            select(model.id).where(fk_column == parent.id).order_by(*order_by).limit(limit)
+            .subquery().select()
+            for parent in chunk
+        ]).subquery()
+        rows = (model.query.join(newest, model.id == newest.c.id)
+                .options(*options)
+                .order_by(*order_by)
+                .all())
+        for row in rows:
+            grouped[getattr(row, fk_column.key)].append(row)
+    for parent in parents:
+        set_committed_value(parent, attr, grouped[parent.id])
+
+# Keyset orderings for the paginated listings; each ends on the primary key
+CHARITY_KEYS = [(Charity.id, False)]
+CHARITY_SORTS = {
+    'total_raised': [(CharityStats.total_raised, True), (CharityStats.charity_id, True)],
+    'donors': [(CharityStats.donor_count, True), (CharityStats.charity_id, True)],
+    'recent': [(CharityStats.last_donation_id, True), (CharityStats.charity_id, True)],
+}
+DONOR_KEYS = [(User.id, False)]
+DONATION_KEYS = [(Donation.date, True), (Donation.id, True)]
+STORY_KEYS = [(Story.date, True), (Story.id, True)]
+TRANSACTION_KEYS = [(CreditTransaction.date, True), (CreditTransaction.id, True)]
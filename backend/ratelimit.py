@@ -0,0 +1,125 @@
+import math
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+from sqlalchemy import case, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from cache import LRUCache
+from extensions import db
+from models import RateLimitBucket
+
+# Throttling for the endpoints that cost bcrypt or SMTP work. Every key is
+# limited with GCRA, a token bucket kept as a single "theoretical arrival
+# time": a limit of N per P seconds admits a burst of N and then one request
+# every P/N seconds. Requests are checked per client IP and per target email
+# before the view runs, so rejected calls never reach the database or bcrypt.
+#
+# The default store lives in process memory (bounded, least recently seen
+# keys are evicted). With several workers set RATE_LIMIT_BACKEND=database so
+# they share state through the rate_limit_bucket table.
+
+_UPSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+# Expired rows are deleted once every this many database checks
+PRUNE_EVERY = 1000
+
+_store = None
+_store_lock = threading.Lock()
+
+def parse_limit(spec):
+    """'10/60' -> (10, 60.0): ten requests per sixty seconds."""
+    count, seconds = spec.split('/')
+    return int(count), float(seconds)
+
+class MemoryStore:
+    def __init__(self, max_entries):
+        self._arrivals = LRUCache(max_entries)
+        self._lock = threading.Lock()
+
+    def hit(self, key, count, period, now):
+        """Record a request and return 0 if allowed, else seconds to wait."""
+        interval = period / count
+        with self._lock:
+            arrival = max(self._arrivals.get(key) or now, now) + interval
+            if arrival - now > period:
+                return arrival - period - now
+            self._arrivals.set(key, arrival)
+            return 0
+
+class DatabaseStore:
+    def __init__(self, engine):
+        self.engine = engine
+        self._calls = 0
+
+    def hit(self, key, count, period, now):
+        interval = period / count
+        bucket = RateLimitBucket.__table__
+        arrival = case((bucket.c.arrival > now, bucket.c.arrival), else_=now) + interval
+        insert = _UPSERTS[self.engine.dialect.name]
+        stmt = insert(bucket).values(key=key, arrival=now + interval).on_conflict_do_update(
+            index_elements=[bucket.c.key],
+            set_={'arrival': arrival},
+            where=arrival - now <= period
+        ).returning(bucket.c.arrival)
+        # Own connection and transaction, independent of the request session
+        with self.engine.begin() as connection:
+            if connection.execute(stmt).first() is not None:
+                self._maybe_prune(connection, now)
+                return 0
+            stored = connection.execute(select(bucket.c.arrival).where(bucket.c.key == key)).scalar()
+        return max(stored + interval - period - now, 0.001)
+
+    def _maybe_prune(self, connection, now):
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            bucket = RateLimitBucket.__table__
+            connection.execute(delete(bucket).where(bucket.c.arrival < now))
+
+def store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if current_app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'database':
+                    _store = DatabaseStore(db.engine)
+                else:
+                    _store = MemoryStore(current_app.config.get('RATE_LIMIT_STORE_SIZE', 10000))
+    return _store
+
+def _target_email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+def check(scope):
+    """Seconds until ``scope`` may be called again by this client, or 0."""
+    config = current_app.config
+    now = time.time()
+    keys = [(f'{scope}:ip:{request.remote_addr}', config.get('RATE_LIMIT_IP', '30/60'))]
+    email = _target_email()
+    if email:
+        keys.append((f'{scope}:email:{email}', config.get('RATE_LIMIT_EMAIL', '10/300')))
+    wait = 0
+    for key, spec in keys:
+        wait = max(wait, store().hit(key, *parse_limit(spec), now))
+    return wait
+
+def rate_limited(scope):
+    """Reject the view with 429 and Retry-After once the caller's IP or the
+    email in the request body exceeds its limit."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if current_app.config.get('RATE_LIMIT_ENABLED', True):
+                wait = check(scope)
+                if wait:
+                    response = jsonify({'message': 'Too many requests, please try again later'})
+                    response.headers['Retry-After'] = str(math.ceil(wait))
+                    return response, 429
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,121 @@
+import random
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from cache import TTLCache
+
+# Read-replica routing. SQLALCHEMY_REPLICA_URIS become extra binds named
+# replica0, replica1, ...; views marked @read_only send their queries to one
+# of them. Everything else goes to the primary, and so does any read that
+# could observe this client's own recent writes:
+# - anything after the session has flushed in the same request,
+# - any request from an identity that committed a write less than
+#   REPLICA_STICKY_SECONDS ago (tracked per process),
+# - lookups wrapped in use_primary(), such as the principal loader.
+
+REPLICA_PREFIX = 'replica'
+STICKY_ENTRIES = 4096
+
+_sticky = None
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('read_only') and not self.info.get('primary') \
+                and not self.info.get('wrote') and not self._flushing:
+            engine = replica_engine(self)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_statement_written(state):
+    # Bulk UPDATE/DELETE statements write without going through a flush
+    if state.is_update or state.is_delete or state.is_insert:
+        state.session.info['wrote'] = True
+
+def replica_engine(session):
+    keys = current_app.extensions.get('replica_keys')
+    if not keys:
+        return None
+    # One replica per session, so a request reads from a single snapshot
+    key = session.info.get('replica')
+    if key is None:
+        key = session.info['replica'] = random.choice(keys)
+    return session._db.engines[key]
+
+def sticky_identities():
+    global _sticky
+    if _sticky is None:
+        _sticky = TTLCache(STICKY_ENTRIES, current_app.config.get('REPLICA_STICKY_SECONDS', 5))
+    return _sticky
+
+def _identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # No JWT was verified for this request
+        return None
+
+def read_only(view):
+    """Route a view's GET queries to a replica, when one is configured."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and current_app.extensions.get('replica_keys'):
+            identity = _identity()
+            if identity is None or sticky_identities().get(str(identity)) is None:
+                current_app.extensions['sqlalchemy'].session.info['read_only'] = True
+        return view(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def use_primary():
+    session = current_app.extensions['sqlalchemy'].session
+    previous = session.info.get('primary')
+    session.info['primary'] = True
+    try:
+        yield
+    finally:
+        session.info['primary'] = previous
+
+def engine_options(config):
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    options = {
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+    }
+    # SQLite connections are cheap and may use a pool without these knobs
+    if not uri.startswith('sqlite'):
+        options.update(
+            pool_size=config.get('DB_POOL_SIZE', 10),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 10),
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+        )
+    return options
+
+def init_app(app):
+    """Set up engine options and replica binds; call before db.init_app()."""
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    keys = []
+    for i, uri in enumerate(app.config.get('SQLALCHEMY_REPLICA_URIS') or []):
+        binds[f'{REPLICA_PREFIX}{i}'] = uri
+        keys.append(f'{REPLICA_PREFIX}{i}')
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['replica_keys'] = keys
+
+    if keys:
+        @app.after_request
+        def _remember_writer(response):
+            session = app.extensions['sqlalchemy'].session
+            identity = _identity()
+            if identity is not None and session.info.get('wrote'):
+                sticky_identities().set(str(identity), True)
+            return response
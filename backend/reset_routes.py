@@ -3,11 +3,13 @@ from models import User
 from extensions import db
 from token_service import generate_reset_token, confirm_reset_token
 from email_service import send_password_reset_email
-import bcrypt
+from passwords import hash_password
+from ratelimit import rate_limited
 
 reset_bp = Blueprint("reset_password", __name__)
 
 @reset_bp.route("/request", methods=["POST"])
+@rate_limited("password-reset")
 def request_password_reset():
     data = request.get_json()
     email = data.get("email")
@@ -29,7 +31,7 @@ def reset_password(token):
     if not user:
         return jsonify({"message": "User not found"}), 404
     # Hash the new password
-    hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed_password = hash_password(new_password)
     user.password = hashed_password
     db.session.commit()
     return jsonify({"message": "Password reset successful"}), 200
\ No newline at end of file
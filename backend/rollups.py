@@ -0,0 +1,155 @@
+from datetime import date, timedelta
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import Charity, Donation, CreditTransaction, DonationsPerDay, CreditsPerDay, CharityStats, CharityDonor
+
+# Daily rollups of the Donation and CreditTransaction ledgers, plus running
+# per-charity totals. The write paths bump these in the same transaction as
+# the ledger insert, so dashboards and listings read a handful of rows
+# instead of scanning the ledgers.
+
+_UPSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+def record_donation(amount, when, count=1):
+    _bump(DonationsPerDay, when.date(), amount, count)
+
+def record_credit_purchase(amount, when, count=1):
+    _bump(CreditsPerDay, when.date(), amount, count)
+
+def _bump(model, day, amount, count):
+    insert = _UPSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(model).values(day=day, total_amount=amount, entry_count=count)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.day],
+            set_={
+                'total_amount': model.total_amount + stmt.excluded.total_amount,
+                'entry_count': model.entry_count + stmt.excluded.entry_count
+            }
+        )
+        db.session.execute(stmt)
+        return
+    updated = db.session.execute(
+        model.__table__.update()
+        .where(model.day == day)
+        .values(total_amount=model.total_amount + amount, entry_count=model.entry_count + count)
+    ).rowcount
+    if not updated:
+        db.session.add(model(day=day, total_amount=amount, entry_count=count))
+
+def record_charity_donations(donor_id, donations):
+    """Fold flushed ``donations`` (all by one donor) into CharityStats."""
+    by_charity = {}
+    for donation in donations:
+        total, count, last = by_charity.get(donation.charity_id, (0, 0, donation))
+        if donation.id > last.id:
+            last = donation
+        by_charity[donation.charity_id] = (total + donation.amount, count + 1, last)
+    insert = _UPSERTS[db.session.get_bind().dialect.name]
+    for charity_id, (total, count, last) in sorted(by_charity.items()):
+        new_donor = db.session.execute(
+            insert(CharityDonor).values(charity_id=charity_id, donor_id=donor_id)
+            .on_conflict_do_nothing()
+        ).rowcount
+        stmt = insert(CharityStats).values(
+            charity_id=charity_id, total_raised=total, donation_count=count, donor_count=new_donor,
+            last_donation_id=last.id, last_donation_at=last.date
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CharityStats.charity_id],
+            set_={
+                'total_raised': CharityStats.total_raised + stmt.excluded.total_raised,
+                'donation_count': CharityStats.donation_count + stmt.excluded.donation_count,
+                'donor_count': CharityStats.donor_count + stmt.excluded.donor_count,
+                'last_donation_id': case(
+                    (stmt.excluded.last_donation_id > CharityStats.last_donation_id, stmt.excluded.last_donation_id),
+                    else_=CharityStats.last_donation_id
+                ),
+                'last_donation_at': case(
+                    (stmt.excluded.last_donation_id > CharityStats.last_donation_id, stmt.excluded.last_donation_at),
+                    else_=CharityStats.last_donation_at
+                )
+            }
+        )
+        db.session.execute(stmt)
+
+def windowed_sums(model, today, windows, days):
+    """Sum ``model.total_amount`` over ``windows`` consecutive windows of
+    ``days`` days ending today, newest first, in a single GROUP BY."""
+    bounds = [(today - timedelta(days=days * (i + 1)), today - timedelta(days=days * i))
+              for i in range(windows)]
+    bucket = case(
+        *[(and_(model.day > start, model.day <= end), i) for i, (start, end) in enumerate(bounds)],
+        else_=None
+    )
+    rows = db.session.execute(
+        select(bucket, func.sum(model.total_amount))
+        .where(model.day > bounds[-1][0], model.day <= today)
+        .group_by(bucket)
+    ).all()
+    sums = [0] * windows
+    for index, total in rows:
+        if index is not None:
+            sums[index] = int(total or 0)
+    return sums
+
+def totals(model):
+    total_amount, entry_count = db.session.execute(
+        select(func.sum(model.total_amount), func.sum(model.entry_count))
+    ).one()
+    return int(total_amount or 0), int(entry_count or 0)
+
+def rebuild():
+    """Recompute the rollup tables and charity stats from the ledgers, e.g.
+    after deploying onto a database that already holds donations."""
+    for model, source in ((DonationsPerDay, Donation), (CreditsPerDay, CreditTransaction)):
+        day = func.date(source.date)
+        rows = db.session.execute(
+            select(day, func.sum(source.amount), func.count(source.id)).group_by(day)
+        ).all()
+        db.session.execute(model.__table__.delete())
+        db.session.add_all([
+            model(day=_as_date(d), total_amount=int(total or 0), entry_count=count)
+            for d, total, count in rows
+        ])
+    rebuild_charity_stats()
+    db.session.commit()
+
+def rebuild_charity_stats():
+    db.session.execute(CharityDonor.__table__.delete())
+    db.session.execute(CharityDonor.__table__.insert().from_select(
+        ['charity_id', 'donor_id'],
+        select(Donation.charity_id, Donation.donor_id).distinct()
+    ))
+    db.session.execute(CharityStats.__table__.delete())
+    last = select(Donation.charity_id, func.max(Donation.id).label('last_id')) \
+        .group_by(Donation.charity_id).subquery()
+    aggregates = select(
+        Donation.charity_id,
+        func.sum(Donation.amount).label('total'),
+        func.count(Donation.id).label('donations'),
+        func.count(Donation.donor_id.distinct()).label('donors')
+    ).group_by(Donation.charity_id).subquery()
+    last_donation = Donation.__table__.alias('last_donation')
+    db.session.execute(CharityStats.__table__.insert().from_select(
+        ['charity_id', 'total_raised', 'donation_count', 'donor_count', 'last_donation_id', 'last_donation_at'],
+        select(
+            Charity.id,
+            func.coalesce(aggregates.c.total, 0),
+            func.coalesce(aggregates.c.donations, 0),
+            func.coalesce(aggregates.c.donors, 0),
+            func.coalesce(last.c.last_id, 0),
+            last_donation.c.date
+        )
+        .outerjoin(aggregates, aggregates.c.charity_id == Charity.id)
+        .outerjoin(last, last.c.charity_id == Charity.id)
+        .outerjoin(last_donation, last_donation.c.id == last.c.last_id)
+    ))
+
+def _as_date(value):
+    # SQLite's date() returns text, Postgres returns a date
+    return date.fromisoformat(value) if isinstance(value, str) else value
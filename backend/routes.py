@@ -1,14 +1,36 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, g, request, jsonify, stream_with_context
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import or_, select, update
 from extensions import db
-from models import User, Charity, Donation, Story, CreditTransaction
+from models import User, Charity, CharityStats, Donation, Story, CreditTransaction, DonationsPerDay, CreditsPerDay
+from auth import current_charity, current_user, invalidate_principal, load_principal, role_required
+from cache import bump, cached_response
+from pagination import InvalidCursor, page_args, paginate, page_response
+from ledger import credit_credits, debit_credits, parse_amount
+from passwords import check_password, hash_password, needs_rehash
+from ratelimit import rate_limited
+from replicas import read_only
+import events
+import exports
+import queries
+import search
+import rollups
+import serializers
 from datetime import datetime, timedelta
-import bcrypt
 import re
 
 api = Blueprint('api', __name__)
 
+@api.errorhandler(InvalidCursor)
+@api.errorhandler(serializers.InvalidFields)
+def invalid_listing_args(e):
+    return jsonify({'message': str(e)}), 400
+
+def nested_limit():
+    return current_app.config.get('API_NESTED_LIMIT', 50)
+
 @api.route('/register', methods=['POST'])
+@rate_limited('register')
 def register():
     data = request.json
     if not data.get('email') or not data.get('password') or not data.get('username') or not data.get('role'):
@@ -19,7 +41,7 @@ def register():
         return jsonify({'message': 'Email already exists'}), 400
     if User.query.filter_by(username=data['username']).first():
         return jsonify({'message': 'Username already exists, please choose a different one'}), 400
-    hashed_password = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed_password = hash_password(data['password'])
     user = User(
         username=data['username'],
         email=data['email'],
@@ -48,6 +70,8 @@ def register():
                 rejected=False
             )
             db.session.add(charity)
+            db.session.flush()
+            db.session.add(CharityStats(charity_id=charity.id))
             db.session.commit()
             # Set charity_id for charity role
             additional_claims = {
@@ -70,12 +94,17 @@ def register():
         return jsonify({'message': f'Registration failed: {str(e)}'}), 500
 
 @api.route('/login', methods=['POST'])
+@rate_limited('login')
 def login():
     data = request.json
     user = User.query.filter_by(email=data['email']).first()
     
-    if not user or not bcrypt.checkpw(data['password'].encode('utf-8'), user.password.encode('utf-8')):
+    if not user or not check_password(data['password'], user.password):
         return jsonify({'message': 'Invalid credentials'}), 401
+    if needs_rehash(user.password):
+        # Move the stored hash to the configured cost while we have the password
+        user.password = hash_password(data['password'])
+        db.session.commit()
     
     # Charity specific checks
     charity = None
@@ -111,6 +140,7 @@ def login():
 
 @api.route('/verify-token', methods=['GET'])
 @jwt_required()
+@read_only
 def verify_token():
     try:
         current_user = get_jwt_identity()  # Returns string from create_access_token
@@ -119,68 +149,40 @@ def verify_token():
         if not current_user:
             return jsonify({"valid": False, "message": "Invalid token"}), 401
         
-        # Convert current_user to int for query
-        user = User.query.get(int(current_user))  # Ensure integer conversion
-        if not user:
+        principal = load_principal(current_user)
+        if not principal:
             return jsonify({"valid": False, "message": "User not found"}), 404
         
         # Verify token claims
-        if claims.get('role') != user.role or claims.get('user_id') != str(user.id):
+        if claims.get('role') != principal.role or claims.get('user_id') != str(principal.user_id):
             return jsonify({"valid": False, "message": "Token claims mismatch"}), 401
         
-        # Fetch charity_id if applicable
-        charity_id = None
-        if user.role == 'charity':
-            charity = Charity.query.filter_by(user_id=user.id).first()
-            charity_id = charity.id if charity else None
-        
         return jsonify({
             "valid": True,
-            "role": user.role,
-            "user_id": user.id,
-            "charity_id": charity_id
+            "role": principal.role,
+            "user_id": principal.user_id,
+            "charity_id": principal.charity_id if principal.role == 'charity' else None
         }), 200
     except Exception as e:
         return jsonify({"valid": False, "message": str(e)}), 401
 
 @api.route('/admin-overview', methods=['GET'])
 @jwt_required()
+@role_required('admin')
+@read_only
 def admin_overview():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.role != 'admin':
-        return jsonify({'message': 'Access denied'}), 403
-    total_donors = User.query.filter_by(role='donor').count()
-    total_charities = Charity.query.count()
-    total_donations = Donation.query.count()
-    total_credits_donated = db.session.query(db.func.sum(Donation.amount)).scalar() or 0
-    total_stories = Story.query.count()
+    total_donors, total_charities, total_stories = db.session.query(
+        db.session.query(db.func.count(User.id)).filter(User.role == 'donor').scalar_subquery(),
+        db.session.query(db.func.count(Charity.id)).scalar_subquery(),
+        db.session.query(db.func.count(Story.id)).scalar_subquery()
+    ).one()
+    total_credits_donated, total_donations = rollups.totals(DonationsPerDay)
     today = datetime.utcnow()
     labels = [(today - timedelta(days=30 * i)).strftime('%Y-%m') for i in range(5, -1, -1)]
-    donor_data = []
-    charity_data = []
-    for i in range(6):
-        start_date = today - timedelta(days=30 * (i + 1))
-        end_date = today - timedelta(days=30 * i)
-        donor_sum = db.session.query(db.func.sum(Donation.amount)).filter(
-            Donation.date >= start_date,
-            Donation.date < end_date
-        ).scalar() or 0
-        charity_sum = db.session.query(db.func.sum(Donation.amount)).filter(
-            Donation.date >= start_date,
-            Donation.date < end_date
-        ).scalar() or 0
-        donor_data.append(donor_sum)
-        charity_data.append(charity_sum)
-    credit_data = []
-    for i in range(6):
-        start_date = today - timedelta(days=30 * (i + 1))
-        end_date = today - timedelta(days=30 * i)
-        credit_sum = db.session.query(db.func.sum(CreditTransaction.amount)).filter(
-            CreditTransaction.date >= start_date,
-            CreditTransaction.date < end_date
-        ).scalar() or 0
-        credit_data.append(credit_sum)
+    # Donor and charity series are the same sum over the donation ledger
+    donor_data = rollups.windowed_sums(DonationsPerDay, today.date(), 6, 30)
+    charity_data = list(donor_data)
+    credit_data = rollups.windowed_sums(CreditsPerDay, today.date(), 6, 30)
     return jsonify({
         'total_donors': total_donors,
         'total_charities': total_charities,
@@ -193,169 +195,213 @@ def admin_overview():
 
 @api.route('/admin/charities', methods=['GET', 'POST'])
 @jwt_required()
+@role_required('admin')
+@read_only
 def admin_charities():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.role != 'admin':
-        return jsonify({'message': 'Access denied'}), 403
     if request.method == 'GET':
-        charities = Charity.query.all()
-        return jsonify([{
-            'id': c.id,
-            'name': c.name,
-            'description': c.description,
-            'location': c.location,
-            'photo_url': c.photo_url,
-            'approved': c.approved,
-            'rejected': c.rejected,
-            'donations': [{
-                'id': d.id,
-                'donor_username': User.query.get(d.donor_id).username if not d.is_anonymous else 'Anonymous',
-                'amount': d.amount,
-                'date': d.date.isoformat(),
-                'is_anonymous': d.is_anonymous
-            } for d in c.donations],
-            'stories': [{
-                'id': s.id,
-                'title': s.title,
-                'date': s.date.isoformat()
-            } for s in c.stories]
-        } for c in charities])
+        listing = serializers.charity_admin.requested()
+        query = queries.project(queries.admin_charities(), listing)
+        page = paginate(query, queries.CHARITY_KEYS, *page_args())
+        queries.attach_charity_collections(
+            page.items, nested_limit(),
+            donations='donations' in listing.keys, stories='stories' in listing.keys,
+            story_columns=serializers.story_headline.columns()
+        )
+        if 'story_count' in listing.keys:
+            queries.attach_totals(page.items, 'story_totals', Story.charity_id)
+        return page_response(page, listing)
     data = request.json
     charity = Charity.query.get(data['charity_id'])
     if not charity:
         return jsonify({'message': 'Charity not found'}), 404
-    charity.approved = data.get('approved', charity.approved)
-    charity.rejected = data.get('rejected', charity.rejected)
+    approved = data.get('approved', charity.approved)
+    rejected = data.get('rejected', charity.rejected)
+    # Re-saving the current status must not re-index or invalidate anything
+    if (approved, rejected) == (charity.approved, charity.rejected):
+        return jsonify({'message': 'Charity status updated'})
+    charity.approved = approved
+    charity.rejected = rejected
+    search.sync_charity(charity)
     db.session.commit()
+    bump('charities')
+    invalidate_principal(charity.user_id)
     return jsonify({'message': 'Charity status updated'})
 
+# decision -> (approved, rejected, result label)
+MODERATION_DECISIONS = {'approve': (True, False, 'approved'), 'reject': (False, True, 'rejected')}
+
+@api.route('/admin/charities/bulk', methods=['POST'])
+@jwt_required()
+@role_required('admin')
+def admin_charities_bulk():
+    data = request.json or {}
+    decision = MODERATION_DECISIONS.get(data.get('decision'))
+    charity_ids = data.get('charity_ids')
+    if decision is None:
+        return jsonify({'message': 'decision must be approve or reject'}), 400
+    if not isinstance(charity_ids, list) or not charity_ids or \
+            not all(isinstance(i, int) and not isinstance(i, bool) for i in charity_ids):
+        return jsonify({'message': 'charity_ids must be a non-empty list of ids'}), 400
+    if len(charity_ids) > current_app.config.get('MODERATION_BATCH_MAX', 500):
+        return jsonify({'message': 'Too many charities in one batch'}), 400
+    approved, rejected, label = decision
+    charity_ids = list(dict.fromkeys(charity_ids))
+
+    existing = set(db.session.scalars(select(Charity.id).where(Charity.id.in_(charity_ids))))
+    # One UPDATE for the whole batch; rows already in the target state are
+    # left alone, so only real transitions are re-indexed and invalidated
+    changed = db.session.execute(
+        update(Charity)
+        .where(Charity.id.in_(charity_ids),
+               or_(Charity.approved.is_not(approved), Charity.rejected.is_not(rejected)))
+        .values(approved=approved, rejected=rejected)
+        .returning(Charity.id, Charity.user_id)
+    ).all()
+    changed_ids = {row.id for row in changed}
+    search.sync_charities(changed_ids)
+    db.session.commit()
+    if changed:
+        bump('charities')
+        for row in changed:
+            invalidate_principal(row.user_id)
+
+    results = [{
+        'charity_id': charity_id,
+        'status': label if charity_id in changed_ids else 'unchanged' if charity_id in existing else 'not_found'
+    } for charity_id in charity_ids]
+    return jsonify({'message': f'{len(changed)} charities {label}', 'results': results})
+
 @api.route('/admin/donors', methods=['GET'])
 @jwt_required()
+@role_required('admin')
+@read_only
 def admin_donors():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.role != 'admin':
-        return jsonify({'message': 'Access denied'}), 403
-    donors = User.query.filter_by(role='donor').all()
-    return jsonify([{
-        'id': d.id,
-        'username': d.username,
-        'email': d.email,
-        'credits': d.credits,
-        'donations': [{
-            'id': don.id,
-            'charity_name': Charity.query.get(don.charity_id).name,
-            'amount': don.amount,
-            'date': don.date.isoformat(),
-            'is_anonymous': don.is_anonymous
-        } for don in d.donations],
-        'credit_transactions': [{
-            'id': t.id,
-            'amount': t.amount,
-            'date': t.date.isoformat()
-        } for t in d.credit_transactions]
-    } for d in donors])
+    page = paginate(queries.admin_donors(), queries.DONOR_KEYS, *page_args())
+    queries.attach_donor_collections(page.items, nested_limit())
+    queries.attach_totals(page.items, 'donation_totals', Donation.donor_id, Donation.amount)
+    queries.attach_totals(page.items, 'purchase_totals', CreditTransaction.user_id, CreditTransaction.amount)
+    return page_response(page, serializers.donor_admin)
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def export_response(name, rows_for_range):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': 'format must be csv or ndjson'}), 400
+    try:
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'message': 'start and end must be ISO dates'}), 400
+    body = stream_with_context(exports.stream(rows_for_range(start, end), fmt))
+    return Response(body, mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={name}.{fmt}'
+    })
+
+@api.route('/admin/export/donations', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+@read_only
+def export_donations():
+    return export_response('donations', exports.donation_rows)
+
+@api.route('/admin/export/credit-transactions', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+@read_only
+def export_credit_transactions():
+    return export_response('credit-transactions', exports.credit_transaction_rows)
 
 @api.route('/credits/purchase', methods=['POST'])
 @jwt_required()
+@role_required('donor')
 def purchase_credits():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.role != 'donor':
-        return jsonify({'message': 'Access denied'}), 403
+    user_id = int(get_jwt_identity())
     data = request.json
-    amount = data.get('amount')
-    if not amount or amount <= 0:
+    amount = parse_amount(data.get('amount'))
+    if amount is None:
         return jsonify({'message': 'Invalid amount'}), 400
-    user.credits += amount
-    transaction = CreditTransaction(user_id=user.id, amount=amount, date=datetime.utcnow())
+    new_balance = credit_credits(user_id, amount)
+    transaction = CreditTransaction(user_id=user_id, amount=amount, date=datetime.utcnow())
     db.session.add(transaction)
+    rollups.record_credit_purchase(amount, transaction.date)
     db.session.commit()
-    return jsonify({'message': 'Credits purchased', 'new_balance': user.credits})
+    return jsonify({'message': 'Credits purchased', 'new_balance': new_balance})
+
+def int_arg(name):
+    """An optional integer query argument; raises ValueError when malformed
+    instead of silently dropping it like ``request.args.get(type=int)``."""
+    value = request.args.get(name)
+    return int(value) if value is not None else None
 
 @api.route('/charities', methods=['GET'])
+@cached_response('charities', 'donations')
+@read_only
 def get_charities():
-    charities = Charity.query.filter_by(approved=True, rejected=False).all()
-    return jsonify([{
-        'id': c.id,
-        'name': c.name,
-        'description': c.description,
-        'mission_statement': c.mission_statement,
-        'location': c.location,
-        'founded_year': c.founded_year,
-        'impact_metrics': c.impact_metrics,
-        'contact_person': c.contact_person,
-        'contact_phone': c.contact_phone,
-        'website': c.website,
-        'photo_url': c.photo_url
-    } for c in charities])
+    sort = request.args.get('sort')
+    try:
+        min_total = int_arg('min_total')
+        min_donors = int_arg('min_donors')
+    except ValueError:
+        return jsonify({'message': 'min_total and min_donors must be integers'}), 400
+    active_since = request.args.get('active_since')
+    if sort and sort not in queries.CHARITY_SORTS:
+        return jsonify({'message': f"sort must be one of: {', '.join(queries.CHARITY_SORTS)}"}), 400
+    listing = serializers.charity_listing.requested()
+    if not sort and min_total is None and min_donors is None and not active_since:
+        query = queries.project(queries.listed_charities(), listing)
+        page = paginate(query, queries.CHARITY_KEYS, *page_args())
+        return page_response(page, listing)
+
+    query = queries.project(queries.ranked_charities(), listing)
+    if min_total is not None:
+        query = query.filter(CharityStats.total_raised >= min_total)
+    if min_donors is not None:
+        query = query.filter(CharityStats.donor_count >= min_donors)
+    if active_since:
+        try:
+            query = query.filter(CharityStats.last_donation_at >= datetime.fromisoformat(active_since))
+        except ValueError:
+            return jsonify({'message': 'active_since must be an ISO date'}), 400
+    order = queries.CHARITY_SORTS.get(sort, [(CharityStats.charity_id, False)])
+    page = paginate(query, order, *page_args(), key=queries.charity_sort_key)
+    return page_response(page, listing)
 
 @api.route('/charities/<int:id>', methods=['GET'])
+@cached_response('charities', 'donations', 'stories')
+@read_only
 def get_charity(id):
-    charity = Charity.query.filter_by(id=id, approved=True, rejected=False).first()
+    charity = queries.charity_detail(id, nested_limit())
     if not charity:
         return jsonify({'message': 'Charity not found or not approved'}), 404
-    return jsonify({
-        'id': charity.id,
-        'name': charity.name,
-        'description': charity.description,
-        'mission_statement': charity.mission_statement,
-        'location': charity.location,
-        'founded_year': charity.founded_year,
-        'impact_metrics': charity.impact_metrics,
-        'contact_person': charity.contact_person,
-        'contact_phone': charity.contact_phone,
-        'website': charity.website,
-        'photo_url': charity.photo_url,
-        'donations': [{
-            'id': d.id,
-            'donor_username': User.query.get(d.donor_id).username if not d.is_anonymous else 'Anonymous',
-            'amount': d.amount,
-            'date': d.date.isoformat(),
-            'is_anonymous': d.is_anonymous
-        } for d in charity.donations],
-        'stories': [{
-            'id': s.id,
-            'title': s.title,
-            'content': s.content,
-            'photo_url': s.photo_url,
-            'date': s.date.isoformat()
-        } for s in charity.stories]
-    })
+    return jsonify(serializers.charity_detail(charity))
 
 @api.route('/stories', methods=['GET', 'POST'])
 @jwt_required(optional=True)
+@cached_response('charities', 'stories')
+@read_only
 def stories():
     if request.method == 'GET':
         charity_id = request.args.get('charity_id', type=int)
         if charity_id:
-            charity = Charity.query.filter_by(id=charity_id, approved=True, rejected=False).first()
+            charity = queries.approved_charities().filter_by(id=charity_id).first()
             if not charity:
                 return jsonify({'message': 'Charity not found or not approved'}), 404
-            stories = Story.query.filter_by(charity_id=charity_id).all()
-            if not stories:
-                return jsonify([])  # Return empty array instead of 404
-        else:
-            stories = Story.query.join(Charity).filter(Charity.approved==True, Charity.rejected==False).all()
-        return jsonify([{
-            'id': s.id,
-            'charity_id': s.charity_id,
-            'charity_name': Charity.query.get(s.charity_id).name,
-            'title': s.title,
-            'content': s.content,
-            'photo_url': s.photo_url,
-            'date': s.date.isoformat()
-        } for s in stories])
+        listing = serializers.story_listing.requested()
+        query = queries.project(queries.approved_stories(charity_id), listing, Story.charity_id, Story.date)
+        if 'excerpt' in listing.keys:
+            query = queries.with_excerpt(query)
+        page = paginate(query, queries.STORY_KEYS, *page_args())
+        return page_response(page, listing)
     
     # POST method requires authentication
     user_id = get_jwt_identity()
     if not user_id:
         return jsonify({'message': 'Authentication required'}), 401
-    user = User.query.get(user_id)
-    if user.role != 'charity':
+    principal = load_principal(user_id)
+    if not principal or principal.role != 'charity':
         return jsonify({'message': 'Access denied'}), 403
-    charity = Charity.query.filter_by(user_id=user_id).first()
+    charity = current_charity()
     if not charity:
         return jsonify({'message': 'Charity not found'}), 404
     if not charity.approved:
@@ -379,28 +425,41 @@ def stories():
         date=datetime.utcnow()
     )
     db.session.add(story)
+    db.session.flush()
+    search.index_story(story, charity)
     db.session.commit()
+    bump('stories')
     
     return jsonify({
         'message': 'Story created successfully',
-        'story': {
-            'id': story.id,
-            'charity_id': story.charity_id,
-            'title': story.title,
-            'content': story.content,
-            'photo_url': story.photo_url,
-            'date': story.date.isoformat()
-        }
+        'story': serializers.story_full(story)
     }), 201
 
+@api.route('/search', methods=['GET'])
+@cached_response('charities', 'stories')
+@read_only
+def search_content():
+    terms = (request.args.get('q') or '').strip()
+    kind = request.args.get('type')
+    if not terms:
+        return jsonify({'message': 'q is required'}), 400
+    if kind not in (None, search.CHARITY, search.STORY):
+        return jsonify({'message': 'type must be charity or story'}), 400
+    limit = min(request.args.get('limit', 20, type=int), current_app.config.get('API_MAX_PAGE_SIZE', 500))
+    return jsonify([{
+        'type': hit['kind'],
+        'id': hit['ref_id'],
+        'charity_id': hit['charity_id'],
+        'title': hit['title'],
+        'snippet': hit['snippet'],
+        'rank': hit['rank']
+    } for hit in search.search(terms, kind, max(limit, 1))])
+
 @api.route('/stories/<int:id>', methods=['PUT'])
 @jwt_required()
+@role_required('charity')
 def update_story(id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.role != 'charity':
-        return jsonify({'message': 'Access denied'}), 403
-    charity = Charity.query.filter_by(user_id=user_id).first()
+    charity = current_charity()
     if not charity:
         return jsonify({'message': 'Charity not found'}), 404
     story = Story.query.get(id)
@@ -422,65 +481,83 @@ def update_story(id):
     story.title = title
     story.content = content
     story.photo_url = photo_url
+    search.index_story(story, charity)
     db.session.commit()
+    bump('stories')
     
     return jsonify({
         'message': 'Story updated successfully',
-        'story': {
-            'id': story.id,
-            'charity_id': story.charity_id,
-            'title': story.title,
-            'content': story.content,
-            'photo_url': story.photo_url,
-            'date': story.date.isoformat()
-        }
+        'story': serializers.story_full(story)
     })
 
 @api.route('/charity/status', methods=['GET'])
 @jwt_required()
+@role_required('charity')
+@read_only
 def charity_status():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.role != 'charity':
-        return jsonify({'message': 'Access denied'}), 403
-    charity = Charity.query.filter_by(user_id=user_id).first()
+    charity = current_charity()
     if not charity:
         return jsonify({'message': 'Charity not found'}), 404
-    return jsonify({
-        'id': charity.id,
-        'name': charity.name,
-        'approved': charity.approved,
-        'rejected': charity.rejected
-    })
+    return jsonify(serializers.charity_status(charity))
 
 @api.route('/charity/donations', methods=['GET'])
 @jwt_required()
+@role_required('charity')
+@read_only
 def charity_donations():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.role != 'charity':
-        return jsonify({'message': 'Access denied'}), 403
-    charity = Charity.query.filter_by(user_id=user_id).first()
+    charity = current_charity()
     if not charity:
         return jsonify({'message': 'Charity not found'}), 404
-    return jsonify([{
-        'id': d.id,
-        'donor_username': User.query.get(d.donor_id).username if not d.is_anonymous else 'Anonymous',
-        'amount': d.amount,
-        'date': d.date.isoformat(),
-        'is_anonymous': d.is_anonymous
-    } for d in charity.donations])
+    page = paginate(queries.charity_donations(charity.id), queries.DONATION_KEYS, *page_args())
+    return page_response(page, serializers.received_donation)
+
+@api.route('/charity/donations/stream', methods=['GET'])
+# EventSource cannot set headers, so this endpoint also takes ?jwt=<token>
+@jwt_required(locations=['headers', 'query_string'])
+@role_required('charity')
+def charity_donation_stream():
+    """Server-Sent Events feed of the caller's new donations. Reconnecting
+    clients send Last-Event-ID (or ?last_event_id=) and first receive what
+    they missed."""
+    charity_id = g.principal.charity_id
+    if charity_id is None:
+        return jsonify({'message': 'Charity not found'}), 404
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None and not last_event_id.isdigit():
+        return jsonify({'message': 'Last-Event-ID must be a donation id'}), 400
+
+    slots = events.stream_slots()
+    if not slots.acquire(blocking=False):
+        response = jsonify({'message': 'Too many open streams, please try again later'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    # Subscribe before reading the backlog so nothing committed in between is lost
+    subscription = events.broker().subscribe(events.charity_topic(charity_id))
+    try:
+        replay = []
+        if last_event_id is not None:
+            missed = queries.charity_donations(charity_id).filter(Donation.id > int(last_event_id)) \
+                .order_by(Donation.id).limit(current_app.config.get('SSE_REPLAY_MAX', 500))
+            replay = [events.donation_event(d, serializers.received_donation) for d in missed]
+    except Exception:
+        subscription.close()
+        slots.release()
+        raise
+    # The body runs after the request context is gone and holds no session
+    stream = events.EventStream(subscription, replay, current_app.config.get('SSE_HEARTBEAT_SECONDS', 15), slots)
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 
 @api.route('/donor/credits', methods=['GET'])
 @jwt_required()
+@role_required('donor')
+@read_only
 def donor_credits():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user or user.role != 'donor':
-            return jsonify({'message': 'Access denied'}), 403
+        user = current_user()
         
         return jsonify({
             'credits': user.credits,
@@ -492,54 +569,37 @@ def donor_credits():
 
 @api.route('/donor/credit-history', methods=['GET'])
 @jwt_required()
+@role_required('donor')
+@read_only
 def donor_credit_history():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user or user.role != 'donor':
-            return jsonify({'message': 'Access denied'}), 403
         
-        transactions = CreditTransaction.query.filter_by(user_id=user_id).all()
-        return jsonify([{
-            'id': t.id,
-            'amount': t.amount,
-            'date': t.date.isoformat(),
-            'user_id': user_id
-        } for t in transactions]), 200
+        page = paginate(queries.donor_credit_transactions(user_id), queries.TRANSACTION_KEYS, *page_args())
+        return page_response(page, lambda t: dict(serializers.credit_transaction(t), user_id=user_id)), 200
     except Exception as e:
         return jsonify({'message': str(e)}), 400
 
 @api.route('/donor/history', methods=['GET'])
 @jwt_required()
+@role_required('donor')
+@read_only
 def donor_history():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
         
-        if not user or user.role != 'donor':
-            return jsonify({'message': 'Access denied'}), 403
-        
-        donations = Donation.query.filter_by(donor_id=user_id).all()
-        return jsonify([{
-            'id': d.id,
-            'charity_id': d.charity_id,
-            'charity_name': Charity.query.get(d.charity_id).name,
-            'amount': d.amount,
-            'date': d.date.isoformat(),
-            'is_anonymous': d.is_anonymous,
-            'user_id': user_id
-        } for d in donations]), 200
+        page = paginate(queries.donor_donations(user_id), queries.DONATION_KEYS, *page_args())
+        return page_response(
+            page, lambda d: dict(serializers.given_donation_with_charity(d), user_id=user_id)
+        ), 200
     except Exception as e:
         return jsonify({'message': str(e)}), 400
 
 @api.route('/donor/donate', methods=['POST'])
 @jwt_required()
+@role_required('donor')
 def donor_donate():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user or user.role != 'donor':
-        return jsonify({'message': 'Access denied'}), 403
+    user_id = int(get_jwt_identity())
 
     data = request.json
     charity_id = data.get('charity_id')
@@ -548,15 +608,20 @@ def donor_donate():
 
     if not charity_id or not amount:
         return jsonify({'message': 'Missing required fields: charity_id and amount'}), 400
-    if not isinstance(amount, (int, float)) or amount <= 0:
-        return jsonify({'message': 'Amount must be a positive number'}), 400
+    if not isinstance(charity_id, int) or isinstance(charity_id, bool) or charity_id <= 0:
+        return jsonify({'message': 'charity_id must be a positive integer id'}), 400
+    amount = parse_amount(amount)
+    if amount is None:
+        return jsonify({'message': 'Amount must be a positive whole number'}), 400
 
     charity = Charity.query.get(charity_id)
     if not charity:
         return jsonify({'message': 'Charity not found'}), 404
     if not charity.approved or charity.rejected:
         return jsonify({'message': 'Charity not approved for donations'}), 403
-    if user.credits < amount:
+    new_balance = debit_credits(user_id, amount)
+    if new_balance is None:
+        db.session.rollback()
         return jsonify({'message': 'Insufficient credits'}), 400
 
     donation = Donation(
@@ -566,22 +631,80 @@ def donor_donate():
         date=datetime.utcnow(),
         is_anonymous=is_anonymous
     )
-    user.credits -= amount
     db.session.add(donation)
+    db.session.flush()
+    rollups.record_donation(amount, donation.date)
+    rollups.record_charity_donations(user_id, [donation])
+    published = {donation.charity_id: [events.donation_event(donation, serializers.received_donation)]}
     db.session.commit()
+    bump('donations')
+    events.publish_donations(published)
 
     return jsonify({
         'message': 'Donation successful',
-        'donation': {
-            'id': donation.id,
-            'charity_name': charity.name,
-            'amount': donation.amount,
-            'date': donation.date.isoformat(),
-            'is_anonymous': donation.is_anonymous
-        },
-        'new_balance': user.credits
+        'donation': serializers.given_donation(donation),
+        'new_balance': new_balance
     }), 201
 
+@api.route('/donor/donate/batch', methods=['POST'])
+@jwt_required()
+@role_required('donor')
+def donor_donate_batch():
+    user_id = int(get_jwt_identity())
 
+    entries = (request.json or {}).get('donations')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'message': 'donations must be a non-empty list'}), 400
+    if len(entries) > current_app.config.get('DONATION_BATCH_MAX', 50):
+        return jsonify({'message': 'Too many donations in one batch'}), 400
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get('charity_id') or not entry.get('amount'):
+            return jsonify({'message': 'Missing required fields: charity_id and amount'}), 400
+        charity_id = entry['charity_id']
+        if not isinstance(charity_id, int) or isinstance(charity_id, bool) or charity_id <= 0:
+            return jsonify({'message': 'charity_id must be a positive integer id'}), 400
+        entry['amount'] = parse_amount(entry['amount'])
+        if entry['amount'] is None:
+            return jsonify({'message': 'Amount must be a positive whole number'}), 400
 
+    charity_ids = {entry['charity_id'] for entry in entries}
+    charities = {c.id: c for c in Charity.query.filter(Charity.id.in_(charity_ids)).all()}
+    for charity_id in charity_ids:
+        charity = charities.get(charity_id)
+        if not charity:
+            return jsonify({'message': f'Charity {charity_id} not found'}), 404
+        if not charity.approved or charity.rejected:
+            return jsonify({'message': f'Charity {charity_id} not approved for donations'}), 403
 
+    total = sum(entry['amount'] for entry in entries)
+    new_balance = debit_credits(user_id, total)
+    if new_balance is None:
+        db.session.rollback()
+        return jsonify({'message': 'Insufficient credits'}), 400
+
+    now = datetime.utcnow()
+    donations = [Donation(
+        donor_id=user_id,
+        charity_id=entry['charity_id'],
+        amount=entry['amount'],
+        date=now,
+        is_anonymous=entry.get('is_anonymous', False)
+    ) for entry in entries]
+    db.session.add_all(donations)
+    db.session.flush()
+    rollups.record_donation(total, now, len(donations))
+    rollups.record_charity_donations(user_id, donations)
+    published = {}
+    for donation in donations:
+        published.setdefault(donation.charity_id, []).append(
+            events.donation_event(donation, serializers.received_donation))
+    db.session.commit()
+    bump('donations')
+    events.publish_donations(published)
+
+    return jsonify({
+        'message': 'Donations successful',
+        'donations': [serializers.given_donation_with_charity(d) for d in donations],
+        'total': total,
+        'new_balance': new_balance
+    }), 201
@@ -0,0 +1,197 @@
+import html
+import re
+from sqlalchemy import bindparam, event, select, text
+from extensions import db
+from models import Charity, Story
+
+# Full-text search over approved charities and their stories. Documents live
+# in a side index that the write paths keep in sync inside their own
+# transaction: a GIN-indexed tsvector table on Postgres, and an FTS5 virtual
+# table on SQLite for local development and tests.
+
+CHARITY = 'charity'
+STORY = 'story'
+
+# Snippets come back as HTML with matches in <b>. The engines mark matches
+# with these private-use characters instead, so the user-supplied text
+# around them can be escaped before the markers become tags.
+MATCH_START = '\ue000'
+MATCH_END = '\ue001'
+HEADLINE_OPTIONS = f'MaxWords=30, MinWords=10, StartSel={MATCH_START}, StopSel={MATCH_END}'
+
+class PostgresSearch:
+    schema = [
+        """CREATE TABLE IF NOT EXISTS search_document (
+            kind VARCHAR(10) NOT NULL,
+            ref_id INTEGER NOT NULL,
+            charity_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            body TEXT NOT NULL,
+            document TSVECTOR NOT NULL,
+            PRIMARY KEY (kind, ref_id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_search_document_document ON search_document USING GIN (document)",
+        "CREATE INDEX IF NOT EXISTS ix_search_document_charity ON search_document (charity_id)",
+    ]
+
+    def index(self, kind, ref_id, charity_id, title, body):
+        self.index_many([(kind, ref_id, charity_id, title, body)])
+
+    def index_many(self, documents):
+        if not documents:
+            return
+        db.session.execute(text("""
+            INSERT INTO search_document (kind, ref_id, charity_id, title, body, document)
+            VALUES (:kind, :ref_id, :charity_id, :title, :body,
+                    setweight(to_tsvector('english', :title), 'A') ||
+                    setweight(to_tsvector('english', :body), 'B'))
+            ON CONFLICT (kind, ref_id) DO UPDATE SET
+                charity_id = EXCLUDED.charity_id, title = EXCLUDED.title,
+                body = EXCLUDED.body, document = EXCLUDED.document
+        """), [_document_params(document) for document in documents])
+
+    def remove_charities(self, charity_ids):
+        db.session.execute(
+            text("DELETE FROM search_document WHERE charity_id IN :charity_ids")
+            .bindparams(bindparam('charity_ids', expanding=True)),
+            {'charity_ids': list(charity_ids)}
+        )
+
+    def clear(self):
+        db.session.execute(text("DELETE FROM search_document"))
+
+    def query(self, terms, kind, limit):
+        # Headlines are costly, so only build them for the page of hits
+        rows = db.session.execute(text("""
+            SELECT kind, ref_id, charity_id, title,
+                   ts_headline('english', body, query, :headline_options) AS snippet,
+                   rank
+            FROM (
+                SELECT kind, ref_id, charity_id, title, body, query, ts_rank_cd(document, query) AS rank
+                FROM search_document, websearch_to_tsquery('english', :terms) AS query
+                WHERE document @@ query %s
+                ORDER BY rank DESC, ref_id
+                LIMIT :limit
+            ) AS hits
+            ORDER BY rank DESC, ref_id
+        """ % ('AND kind = :kind' if kind else '')),
+            dict(terms=terms, kind=kind, limit=limit, headline_options=HEADLINE_OPTIONS))
+        return [_hit(row) for row in rows]
+
+class SqliteSearch:
+    schema = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            kind UNINDEXED, ref_id UNINDEXED, charity_id UNINDEXED, title, body,
+            tokenize = 'porter unicode61'
+        )""",
+    ]
+
+    def index(self, kind, ref_id, charity_id, title, body):
+        self.index_many([(kind, ref_id, charity_id, title, body)])
+
+    def index_many(self, documents):
+        if not documents:
+            return
+        params = [_document_params(document) for document in documents]
+        db.session.execute(text("DELETE FROM search_index WHERE kind = :kind AND ref_id = :ref_id"), params)
+        db.session.execute(text(
+            "INSERT INTO search_index (kind, ref_id, charity_id, title, body) "
+            "VALUES (:kind, :ref_id, :charity_id, :title, :body)"
+        ), params)
+
+    def remove_charities(self, charity_ids):
+        db.session.execute(
+            text("DELETE FROM search_index WHERE charity_id IN :charity_ids")
+            .bindparams(bindparam('charity_ids', expanding=True)),
+            {'charity_ids': list(charity_ids)}
+        )
+
+    def clear(self):
+        db.session.execute(text("DELETE FROM search_index"))
+
+    def query(self, terms, kind, limit):
+        # Quote every word so user input is never parsed as FTS5 syntax
+        words = re.findall(r'\w+', terms)
+        if not words:
+            return []
+        match = ' '.join('"%s"' % word for word in words)
+        rows = db.session.execute(text("""
+            SELECT kind, ref_id, charity_id, title,
+                   snippet(search_index, 4, :match_start, :match_end, '…', 24) AS snippet,
+                   -bm25(search_index, 0, 0, 0, 4.0, 1.0) AS rank
+            FROM search_index
+            WHERE search_index MATCH :match %s
+            ORDER BY rank DESC, ref_id
+            LIMIT :limit
+        """ % ('AND kind = :kind' if kind else '')),
+            dict(match=match, kind=kind, limit=limit, match_start=MATCH_START, match_end=MATCH_END))
+        return [_hit(row) for row in rows]
+
+BACKENDS = {
+    'postgresql': PostgresSearch(),
+    'sqlite': SqliteSearch(),
+}
+
+def backend():
+    return BACKENDS[db.session.get_bind().dialect.name]
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_schema(target, connection, **kw):
+    create_schema(connection)
+
+def create_schema(connection):
+    search = BACKENDS.get(connection.dialect.name)
+    for statement in search.schema if search else []:
+        connection.exec_driver_sql(statement)
+
+def _hit(row):
+    hit = dict(row._mapping)
+    hit['snippet'] = html.escape(hit['snippet'] or '').replace(MATCH_START, '<b>').replace(MATCH_END, '</b>')
+    return hit
+
+def _document_params(document):
+    kind, ref_id, charity_id, title, body = document
+    return dict(kind=kind, ref_id=ref_id, charity_id=charity_id, title=title, body=body)
+
+def _charity_body(charity):
+    return '\n'.join(filter(None, [charity.description, charity.mission_statement, charity.location]))
+
+def index_story(story, charity=None):
+    charity = charity or story.charity
+    if charity.approved and not charity.rejected:
+        backend().index(STORY, story.id, story.charity_id, story.title, story.content)
+
+def sync_charity(charity):
+    """(Re)index a charity and its stories if it is publicly listed, or drop
+    them from the index if it is not. Call before committing a change to
+    the charity's approval."""
+    # Autoflush makes the pending approval visible to sync_charities' query
+    sync_charities([charity.id])
+
+def sync_charities(charity_ids):
+    """sync_charity() for many charities at once, with a fixed number of
+    statements however many ids are given."""
+    charity_ids = list(charity_ids)
+    if not charity_ids:
+        return
+    search = backend()
+    search.remove_charities(charity_ids)
+    listed = Charity.query.filter(Charity.id.in_(charity_ids), Charity.approved == True,
+                                  Charity.rejected == False).all()
+    if not listed:
+        return
+    documents = [(CHARITY, c.id, c.id, c.name, _charity_body(c)) for c in listed]
+    stories = Story.query.filter(Story.charity_id.in_([c.id for c in listed]))
+    documents += [(STORY, s.id, s.charity_id, s.title, s.content) for s in stories]
+    search.index_many(documents)
+
+def rebuild():
+    create_schema(db.session.connection())
+    backend().clear()
+    sync_charities(db.session.scalars(
+        select(Charity.id).where(Charity.approved == True, Charity.rejected == False)
+    ))
+    db.session.commit()
+
+def search(terms, kind=None, limit=20):
+    return backend().query(terms, kind, limit)
@@ -0,0 +1,181 @@
+import itertools
+from flask import current_app, request
+from sqlalchemy import DateTime, inspect
+from cache import LRUCache
+from models import User, Charity, Donation, Story, CreditTransaction
+
+# Model -> dict projections. Each projection is declared once as a field list
+# and compiled into a plain function that builds the dict literal directly,
+# so serializing a row is one call with no per-field dispatch. Datetime
+# columns are rendered with isoformat(); any field can instead be a
+# (key, function) pair for computed or nested values. List endpoints serve
+# subsets chosen with ?fields= or ?view=summary; each subset is compiled once
+# and its columns() drive load_only() so unused Text columns stay unfetched.
+# Clients choose the subsets, so each projection keeps only the
+# SUBSET_CACHE_SIZE most recently used ones compiled.
+
+SUBSET_CACHE_SIZE = 32
+
+class InvalidFields(ValueError):
+    pass
+
+class Projection:
+    def __init__(self, name, model, fields, extras=(), summary=None):
+        self.name = name
+        self.model = model
+        self.fields = list(fields)
+        # Optional fields only served when asked for with ?fields=, and the
+        # subset served for ?view=summary
+        self.extras = list(extras)
+        self.summary = summary
+        self.keys = [_key(field) for field in self.fields]
+        self._serialize = _compile(name, model, self.fields)
+        self._subsets = LRUCache(SUBSET_CACHE_SIZE)
+        self._subset_ids = itertools.count()
+
+    def __call__(self, obj):
+        return self._serialize(obj)
+
+    def columns(self):
+        """The mapped column attributes this projection reads directly."""
+        names = inspect(self.model).columns.keys()
+        return [getattr(self.model, f) for f in self.fields if isinstance(f, str) and f in names]
+
+    def select(self, keys):
+        """A compiled projection of just ``keys``, in declaration order."""
+        wanted = tuple(f for f in self.fields + self.extras if _key(f) in keys)
+        subset = self._subsets.get(wanted)
+        if subset is None:
+            subset = Projection(f'{self.name}_{next(self._subset_ids)}', self.model, wanted)
+            self._subsets.set(wanted, subset)
+        return subset
+
+    def requested(self):
+        """The projection asked for by ``?fields=a,b`` or ``?view=summary``;
+        the full projection otherwise."""
+        fields = request.args.get('fields')
+        view = request.args.get('view', 'full')
+        if fields:
+            keys = {key.strip() for key in fields.split(',') if key.strip()}
+            unknown = keys - set(self.keys) - {_key(f) for f in self.extras}
+            if unknown:
+                raise InvalidFields(f"Unknown field(s): {', '.join(sorted(unknown))}")
+            return self.select(keys)
+        if view == 'summary' and self.summary:
+            return self.select(self.summary)
+        if view not in ('full', 'summary'):
+            raise InvalidFields('view must be full or summary')
+        return self
+
+def projection(name, model, fields, extras=(), summary=None):
+    return Projection(name, model, fields, extras, summary)
+
+def many(serializer, attr):
+    return lambda obj: [serializer(item) for item in getattr(obj, attr)]
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+def _key(field):
+    return field if isinstance(field, str) else field[0]
+
+def _compile(name, model, fields):
+    columns = inspect(model).columns
+    namespace = {'_iso': _iso}
+    items = []
+    for i, field in enumerate(fields):
+        if isinstance(field, str):
+            key, column = field, columns.get(field)
+            if column is not None and isinstance(column.type, DateTime):
+                expr = f'obj.{field}.isoformat()' if not column.nullable else f'_iso(obj.{field})'
+            else:
+                expr = f'obj.{field}'
+        else:
+            key, function = field
+            namespace[f'_field{i}'] = function
+            expr = f'_field{i}(obj)'
+        items.append(f'{key!r}: {expr}')
+    source = f"def {name}(obj):\n    return {{{', '.join(items)}}}\n"
+    exec(compile(source, f'<projection {name}>', 'exec'), namespace)
+    return namespace[name]
+
+def donor_label(donation):
+    # Relies on Donation.donor having been eager-loaded by the caller
+    return 'Anonymous' if donation.is_anonymous else donation.donor.username
+
+def _stat(name, default=0):
+    def read(charity):
+        stats = charity.stats
+        value = getattr(stats, name) if stats else None
+        return default if value is None else value
+    return read
+
+def _excerpt(story):
+    # story.excerpt is the first STORY_EXCERPT_LENGTH + 1 characters of the
+    # content, cut in SQL (see queries.with_excerpt); the extra character
+    # tells whether anything was left out
+    length = current_app.config.get('STORY_EXCERPT_LENGTH', 200)
+    text = story.excerpt or ''
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0].rstrip() + '…'
+
+def _last_donation_at(charity):
+    return _iso(charity.stats.last_donation_at) if charity.stats else None
+
+CHARITY_PUBLIC_FIELDS = [
+    'id', 'name', 'description', 'mission_statement', 'location', 'founded_year', 'impact_metrics',
+    'contact_person', 'contact_phone', 'website', 'photo_url'
+]
+
+received_donation = projection('received_donation', Donation, [
+    'id', ('donor_username', donor_label), 'amount', 'date', 'is_anonymous'
+])
+given_donation = projection('given_donation', Donation, [
+    'id', ('charity_name', lambda d: d.charity.name), 'amount', 'date', 'is_anonymous'
+])
+given_donation_with_charity = projection('given_donation_with_charity', Donation,
+                                         given_donation.fields + ['charity_id'])
+credit_transaction = projection('credit_transaction', CreditTransaction, ['id', 'amount', 'date'])
+
+story_headline = projection('story_headline', Story, ['id', 'title', 'date'])
+story_body = projection('story_body', Story, ['id', 'title', 'content', 'photo_url', 'date'])
+story_full = projection('story_full', Story, ['id', 'charity_id', 'title', 'content', 'photo_url', 'date'])
+story_listing = projection('story_listing', Story,
+                           story_full.fields + [('charity_name', lambda s: s.charity.name)],
+                           extras=[('excerpt', _excerpt)],
+                           summary=['id', 'charity_id', 'charity_name', 'title', 'photo_url', 'date', 'excerpt'])
+
+charity_public = projection('charity_public', Charity, CHARITY_PUBLIC_FIELDS)
+charity_listing = projection('charity_listing', Charity, CHARITY_PUBLIC_FIELDS + [
+    ('total_raised', _stat('total_raised')),
+    ('donation_count', _stat('donation_count')),
+    ('donor_count', _stat('donor_count')),
+    ('last_donation_at', _last_donation_at)
+], summary=['id', 'name', 'location', 'founded_year', 'photo_url',
+            'total_raised', 'donation_count', 'donor_count', 'last_donation_at'])
+charity_detail = projection('charity_detail', Charity, CHARITY_PUBLIC_FIELDS + [
+    ('donations', many(received_donation, 'donations')),
+    ('stories', many(story_body, 'stories'))
+])
+charity_admin = projection('charity_admin', Charity, [
+    'id', 'name', 'description', 'location', 'photo_url', 'approved', 'rejected',
+    ('total_raised', _stat('total_raised')),
+    ('donation_count', _stat('donation_count')),
+    ('story_count', lambda c: c.story_totals[0]),
+    ('donations', many(received_donation, 'donations')),
+    ('stories', many(story_headline, 'stories'))
+], summary=['id', 'name', 'location', 'photo_url', 'approved', 'rejected',
+            'total_raised', 'donation_count', 'story_count'])
+charity_status = projection('charity_status', Charity, ['id', 'name', 'approved', 'rejected'])
+
+donor_admin = projection('donor_admin', User, [
+    'id', 'username', 'email', 'credits',
+    # Totals over the donor's whole history; the nested lists are capped
+    ('donation_count', lambda u: u.donation_totals[0]),
+    ('donation_total', lambda u: u.donation_totals[1]),
+    ('purchase_count', lambda u: u.purchase_totals[0]),
+    ('purchase_total', lambda u: u.purchase_totals[1]),
+    ('donations', many(given_donation, 'donations')),
+    ('credit_transactions', many(credit_transaction, 'credit_transactions'))
+])
@@ -0,0 +1,78 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from common import load_app
+
+# Parallel donations against one donor must never spend the same credits
+# twice: the balance and the donations booked have to add up to what was
+# purchased, with every donation beyond the balance rejected.
+
+CREDITS = 100
+AMOUNT = 3
+
+@pytest.fixture
+def donor(tmp_path):
+    app, _ = load_app('sqlite:///' + str(tmp_path / 'test.db'))
+    client = app.test_client()
+    admin = client.post('/api/register', json={
+        'email': 'admin@example.com', 'password': 'pw', 'username': 'admin', 'role': 'admin'
+    }).json['access_token']
+    charity = client.post('/api/register', json={
+        'email': 'charity@example.com', 'password': 'pw', 'username': 'charity',
+        'role': 'charity', 'charity': {'name': 'Test Charity'}
+    }).json
+    client.post('/api/admin/charities', json={'charity_id': charity['charity_id'], 'approved': True},
+                headers={'Authorization': f'Bearer {admin}'})
+    registered = client.post('/api/register', json={
+        'email': 'donor@example.com', 'password': 'pw', 'username': 'donor', 'role': 'donor'
+    }).json
+    headers = {'Authorization': f"Bearer {registered['access_token']}"}
+    client.post('/api/credits/purchase', json={'amount': CREDITS}, headers=headers)
+    return app, headers, registered['user_id'], charity['charity_id']
+
+def donated(app, user_id):
+    from extensions import db
+    from models import Donation, User
+    with app.app_context():
+        balance = db.session.get(User, user_id).credits
+        total = db.session.query(db.func.coalesce(db.func.sum(Donation.amount), 0)) \
+            .filter(Donation.donor_id == user_id).scalar()
+    return balance, total
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_parallel_donations_do_not_double_spend(donor, batch):
+    app, headers, user_id, charity_id = donor
+    attempts = 60
+
+    def donate(_):
+        client = app.test_client()
+        if batch:
+            return client.post('/api/donor/donate/batch', headers=headers, json={'donations': [
+                {'charity_id': charity_id, 'amount': AMOUNT}
+            ]}).status_code
+        return client.post('/api/donor/donate', headers=headers, json={
+            'charity_id': charity_id, 'amount': AMOUNT
+        }).status_code
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(donate, range(attempts)))
+
+    assert statuses.count(201) == CREDITS // AMOUNT
+    assert statuses.count(400) == attempts - CREDITS // AMOUNT
+    balance, total = donated(app, user_id)
+    assert balance == CREDITS % AMOUNT
+    assert balance + total == CREDITS
+
+@pytest.mark.parametrize('charity_id', [[1], {'id': 1}, '1', True, -1, 1.5])
+def test_donate_rejects_malformed_charity_id(donor, charity_id):
+    app, headers, user_id, _ = donor
+    response = app.test_client().post('/api/donor/donate', headers=headers, json={
+        'charity_id': charity_id, 'amount': AMOUNT
+    })
+    assert response.status_code == 400, response.get_data(as_text=True)
+    assert donated(app, user_id) == (CREDITS, 0)
@@ -1,8 +1,15 @@
-from email_service import send_password_reset_email
+from app import create_app
+from email_service import SMTPConnection, deliver_pending, send_password_reset_email
 from token_service import generate_reset_token
 
 
 to_email = "test@example.com"
 email = to_email
 token = generate_reset_token(email)
-send_password_reset_email(email, token)
\ No newline at end of file
+app = create_app()
+with app.app_context():
+    send_password_reset_email(email, token)
+    # Deliver right away instead of waiting for the background sender
+    connection = SMTPConnection()
+    deliver_pending(connection)
+    connection.close()
\ No newline at end of file
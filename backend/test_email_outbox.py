@@ -0,0 +1,118 @@
+import os
+import smtplib
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from common import load_app
+
+# The outbox is drained against a stand-in for smtplib.SMTP that records
+# every session it opens and can be told to refuse particular recipients.
+
+class StubSMTP:
+    sessions = []
+    refuse = {}
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.closed = False
+        StubSMTP.sessions.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def sendmail(self, from_addr, to_addrs, message):
+        error = StubSMTP.refuse.get(to_addrs)
+        if error is not None:
+            raise error
+        self.sent.append(to_addrs)
+
+    def quit(self):
+        self.closed = True
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    app, _ = load_app('sqlite:///' + str(tmp_path / 'test.db'))
+    import email_service
+    monkeypatch.setattr(email_service.smtplib, 'SMTP', StubSMTP)
+    monkeypatch.setattr(email_service, 'FROM_EMAIL', 'noreply@example.com')
+    monkeypatch.setattr(StubSMTP, 'sessions', [])
+    monkeypatch.setattr(StubSMTP, 'refuse', {})
+    with app.app_context():
+        yield email_service
+
+def queue(email_service, *recipients):
+    from extensions import db
+    for to_email in recipients:
+        db.session.add(email_service.EmailOutbox(
+            to_email=to_email, subject='Hello', html_content='<p>Hi</p>', plain_text='Hi'
+        ))
+    db.session.commit()
+
+def rows():
+    from models import EmailOutbox
+    return {item.to_email: item for item in EmailOutbox.query.order_by(EmailOutbox.id)}
+
+def sent():
+    return [to_email for session in StubSMTP.sessions for to_email in session.sent]
+
+def test_batches_share_one_session(outbox):
+    recipients = [f'user{i}@example.com' for i in range(5)]
+    queue(outbox, *recipients)
+    connection = outbox.SMTPConnection()
+    assert outbox.deliver_pending(connection, limit=2) == 2
+    assert outbox.deliver_pending(connection, limit=2) == 2
+    assert outbox.deliver_pending(connection, limit=2) == 1
+    assert outbox.deliver_pending(connection, limit=2) == 0
+    assert len(StubSMTP.sessions) == 1
+    assert sent() == recipients
+    assert all(item.status == 'sent' and item.sent_at for item in rows().values())
+
+def test_failure_backs_off_without_blocking_the_queue(outbox):
+    StubSMTP.refuse['bad@example.com'] = smtplib.SMTPRecipientsRefused({})
+    queue(outbox, 'first@example.com', 'bad@example.com', 'last@example.com')
+    connection = outbox.SMTPConnection()
+    before = datetime.utcnow()
+    assert outbox.deliver_pending(connection) == 3
+    assert sent() == ['first@example.com', 'last@example.com']
+    # The session is dropped after a failure and reopened for the next row
+    assert len(StubSMTP.sessions) == 2 and StubSMTP.sessions[0].closed
+    bad = rows()['bad@example.com']
+    assert (bad.status, bad.attempts) == ('pending', 1)
+    delay = timedelta(seconds=outbox.EMAIL_RETRY_BASE_SECONDS)
+    assert before + delay <= bad.next_attempt_at <= datetime.utcnow() + delay
+    # Not due again until its backoff has passed
+    assert outbox.deliver_pending(connection) == 0
+
+def test_backoff_doubles_until_the_row_fails(outbox, monkeypatch):
+    from extensions import db
+    monkeypatch.setattr(outbox, 'EMAIL_MAX_ATTEMPTS', 3)
+    StubSMTP.refuse['bad@example.com'] = smtplib.SMTPDataError(554, b'rejected')
+    queue(outbox, 'bad@example.com')
+    connection = outbox.SMTPConnection()
+    delays = []
+    for _ in range(3):
+        start = datetime.utcnow()
+        assert outbox.deliver_pending(connection) == 1
+        bad = rows()['bad@example.com']
+        delays.append(round((bad.next_attempt_at - start).total_seconds()))
+        bad.next_attempt_at = datetime.utcnow()
+        db.session.commit()
+    base = outbox.EMAIL_RETRY_BASE_SECONDS
+    assert delays[:2] == [base, 2 * base]
+    assert (bad.status, bad.attempts) == ('failed', 3)
+    assert outbox.deliver_pending(connection) == 0
+
+def test_unexpected_error_keeps_earlier_rows_sent(outbox):
+    StubSMTP.refuse['bad@example.com'] = ValueError('malformed message')
+    queue(outbox, 'first@example.com', 'bad@example.com', 'last@example.com')
+    assert outbox.deliver_pending(outbox.SMTPConnection()) == 3
+    statuses = {to_email: item.status for to_email, item in rows().items()}
+    assert statuses == {'first@example.com': 'sent', 'bad@example.com': 'pending', 'last@example.com': 'sent'}
+    assert sent() == ['first@example.com', 'last@example.com']
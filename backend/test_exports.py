@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from common import auth_headers, load_app
+from seed import seed
+
+# Usernames and charity names are user input; a CSV export must not hand
+# them to a spreadsheet as formulas, while NDJSON keeps them verbatim.
+
+NAMES = ['=HYPERLINK("https://example.com")', '+1+1', '-2+3', '@SUM(A1)', '\tindent', 'plain']
+
+@pytest.fixture(scope='module')
+def exported(tmp_path_factory):
+    from extensions import db
+    from models import User
+    database = 'sqlite:///' + str(tmp_path_factory.mktemp('exports') / 'test.db')
+    app, _ = load_app(database)
+    with app.app_context():
+        ids = seed(donors=len(NAMES), charities=2, donations=20, stories=0, transactions=200)
+        donors = User.query.filter_by(role='donor').order_by(User.id).all()
+        for donor, name in zip(donors, NAMES):
+            donor.username = name
+        db.session.commit()
+    client = app.test_client()
+    headers = auth_headers(app, ids['admin_id'])
+    url = '/api/admin/export/credit-transactions?format='
+    return {fmt: client.get(url + fmt, headers=headers).get_data(as_text=True) for fmt in ('csv', 'ndjson')}
+
+def test_csv_neutralizes_formulas(exported):
+    rows = list(csv.DictReader(io.StringIO(exported['csv'])))
+    usernames = {row['username'] for row in rows}
+    assert usernames == {"'" + name for name in NAMES[:-1]} | {'plain'}
+    assert all(int(row['amount']) > 0 for row in rows)
+
+def test_ndjson_is_verbatim(exported):
+    usernames = {json.loads(line)['username'] for line in exported['ndjson'].splitlines()}
+    assert usernames == set(NAMES)
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from common import auth_headers, load_app
+from seed import seed
+
+# Moderating a charity re-indexes it and its stories with a fixed number of
+# statements, and re-saving the status it already has touches nothing.
+
+STORIES = {'small': 20, 'large': 200}
+PENDING_CHARITY = 7  # seed() leaves every seventh charity awaiting approval
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+def moderate(app, client, headers, **status):
+    import auth
+    from extensions import db
+    with app.app_context():
+        auth.principal_cache().clear()
+        engine = db.engine
+    thread = threading.get_ident()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.post('/api/admin/charities', headers=headers,
+                               json=dict(charity_id=PENDING_CHARITY, **status))
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return statements
+
+@pytest.fixture(scope='module')
+def moderation(tmp_path_factory):
+    import cache
+    results = {}
+    for size, stories in STORIES.items():
+        database = 'sqlite:///' + str(tmp_path_factory.mktemp(size) / 'test.db')
+        app, _ = load_app(database)
+        with app.app_context():
+            ids = seed(donors=20, charities=10, donations=200, stories=stories, transactions=50)
+        client = app.test_client()
+        headers = auth_headers(app, ids['admin_id'])
+        approval = moderate(app, client, headers, approved=True)
+        hits = client.get('/api/search?q=school&type=charity&limit=50').json
+        version = cache.version('charities')
+        resave = moderate(app, client, headers, approved=True, rejected=False)
+        results[size] = dict(
+            approval=approval, hits=hits, resave=resave,
+            bumped=cache.version('charities') != version
+        )
+    return results
+
+def test_approval_statements_do_not_grow_with_stories(moderation):
+    assert len(moderation['small']['approval']) == len(moderation['large']['approval'])
+
+@pytest.mark.parametrize('size', STORIES)
+def test_approved_charity_is_searchable(moderation, size):
+    assert PENDING_CHARITY in {hit['charity_id'] for hit in moderation[size]['hits']}
+
+@pytest.mark.parametrize('size', STORIES)
+def test_unchanged_status_is_not_reindexed(moderation, size):
+    resave = moderation[size]['resave']
+    assert not [s for s in resave if s.lstrip().upper().startswith(WRITES)]
+    assert not moderation[size]['bumped']
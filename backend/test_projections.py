@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from common import auth_headers, load_app
+from seed import seed
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    database = 'sqlite:///' + str(tmp_path_factory.mktemp('projections') / 'test.db')
+    app, _ = load_app(database, RESPONSE_CACHE_SIZE=0)
+    with app.app_context():
+        ids = seed(donors=20, charities=10, donations=200, stories=20, transactions=50)
+    client = app.test_client()
+    client.admin_headers = auth_headers(app, ids['admin_id'])
+    return client
+
+@pytest.mark.parametrize('url, field', [
+    ('/api/charities?fields=total_raised', 'total_raised'),
+    ('/api/charities?fields=total_raised&sort=donors', 'total_raised'),
+    ('/api/stories?fields=charity_name', 'charity_name'),
+    ('/api/stories?fields=excerpt', 'excerpt'),
+])
+def test_computed_only_fields(client, url, field):
+    response = client.get(url)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.json and all(list(item) == [field] for item in response.json)
+
+def test_computed_only_fields_admin(client):
+    response = client.get('/api/admin/charities?fields=donations', headers=client.admin_headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.json and all(list(item) == ['donations'] for item in response.json)
+
+def test_unknown_field_is_rejected(client):
+    assert client.get('/api/charities?fields=password').status_code == 400
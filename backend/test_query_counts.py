@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from common import auth_headers, load_app
+from seed import seed
+
+# Listing endpoints eager-load their relations, so the number of SQL
+# statements per request must not grow with the amount of data behind it.
+
+SIZES = {
+    'small': dict(donors=20, charities=10, donations=200, stories=20, transactions=50),
+    'large': dict(donors=100, charities=40, donations=2000, stories=200, transactions=500),
+}
+
+ENDPOINTS = {
+    'charities': ('/api/charities', None),
+    'charity': ('/api/charities/{charity_id}', None),
+    'stories': ('/api/stories', None),
+    'donor_history': ('/api/donor/history', 'donor_id'),
+    'admin_charities': ('/api/admin/charities', 'admin_id'),
+    'admin_overview': ('/api/admin-overview', 'admin_id'),
+    'admin_donors': ('/api/admin/donors', 'admin_id'),
+    'charity_donations': ('/api/charity/donations', 'charity_user_id'),
+    'donor_credit_history': ('/api/donor/credit-history', 'donor_id'),
+}
+
+def count_queries(app, client, url, headers):
+    import auth
+    import cache
+    from extensions import db
+    with app.app_context():
+        # Start cold so every request does its full amount of work
+        cache.response_cache().clear()
+        auth.principal_cache().clear()
+        engine = db.engine
+    # Only count this thread's statements, not the outbox sender's
+    thread = threading.get_ident()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements)
+
+@pytest.fixture(scope='module')
+def query_counts(tmp_path_factory):
+    counts = {}
+    for size, rows in SIZES.items():
+        database = 'sqlite:///' + str(tmp_path_factory.mktemp(size) / 'test.db')
+        app, _ = load_app(database)
+        with app.app_context():
+            ids = seed(**rows)
+        client = app.test_client()
+        for name, (url, user) in ENDPOINTS.items():
+            headers = auth_headers(app, ids[user]) if user else {}
+            counts[name, size] = count_queries(app, client, url.format(**ids), headers)
+    return counts
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_query_count_is_independent_of_row_count(query_counts, endpoint):
+    assert query_counts[endpoint, 'small'] == query_counts[endpoint, 'large']
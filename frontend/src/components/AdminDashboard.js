@@ -11,9 +11,24 @@ ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, Title, T
 
 const API_URL = 'https://tuinue-wasichana-v3.onrender.com';
 
+// Admin listings come a page at a time; X-Next-Cursor addresses the next page
+const fetchPage = async (path, token, cursor) => {
+  const response = await axios.get(`${API_URL}${path}`, {
+    headers: { Authorization: `Bearer ${token}` },
+    params: cursor ? { cursor } : {}
+  });
+  return {
+    items: response.data,
+    next: response.headers['x-next-cursor'] || null,
+    total: Number(response.headers['x-total-count'] || response.data.length)
+  };
+};
+
 const AdminDashboard = () => {
   const [charities, setCharities] = useState([]);
+  const [charityPage, setCharityPage] = useState({ next: null, total: 0 });
   const [donors, setDonors] = useState([]);
+  const [donorPage, setDonorPage] = useState({ next: null, total: 0 });
   const [overview, setOverview] = useState({});
   const [error, setError] = useState('');
   const token = localStorage.getItem('token');
@@ -22,13 +37,15 @@ const AdminDashboard = () => {
     const fetchData = async () => {
       setError('');
       try {
-        const [charitiesRes, donorsRes, overviewRes] = await Promise.all([
-          axios.get(`${API_URL}/api/admin/charities`, { headers: { Authorization: `Bearer ${token}` } }),
-          axios.get(`${API_URL}/api/admin/donors`, { headers: { Authorization: `Bearer ${token}` } }),
+        const [charitiesPage, donorsPage, overviewRes] = await Promise.all([
+          fetchPage('/api/admin/charities', token),
+          fetchPage('/api/admin/donors', token),
           axios.get(`${API_URL}/api/admin-overview`, { headers: { Authorization: `Bearer ${token}` } })
         ]);
-        setCharities(charitiesRes.data);
-        setDonors(donorsRes.data);
+        setCharities(charitiesPage.items);
+        setCharityPage(charitiesPage);
+        setDonors(donorsPage.items);
+        setDonorPage(donorsPage);
         setOverview(overviewRes.data);
       } catch (err) {
         const message = err.response?.data?.message || 'Failed to fetch dashboard data. Please try again.';
@@ -40,6 +57,19 @@ const AdminDashboard = () => {
     if (token) fetchData();
   }, [token]);
 
+  const loadMore = async (path, page, setItems, setPage) => {
+    try {
+      const nextPage = await fetchPage(path, token, page.next);
+      setItems(items => [...items, ...nextPage.items]);
+      setPage(nextPage);
+    } catch (err) {
+      const message = err.response?.data?.message || 'Failed to load more results';
+      setError(message);
+      toast.dismiss(); // Clear existing toasts
+      toast.error(message, { position: 'top-right', toastId: 'load-more-error', autoClose: 5000 });
+    }
+  };
+
   const handleApprove = async (charityId, approved, rejected) => {
     try {
       await axios.post(
@@ -152,7 +182,8 @@ const AdminDashboard = () => {
                   <td>{c.location}</td>
                   <td>{c.approved ? 'Approved' : c.rejected ? 'Rejected' : 'Pending'}</td>
                   <td>
-                    {c.donations.length} (Total: {c.donations.reduce((sum, d) => sum + d.amount, 0)} credits)
+                    {c.donation_count} (Total: {c.total_raised} credits)
+                    {c.donations.length < c.donation_count && <div><small>Latest {c.donations.length} shown</small></div>}
                     <ul>
                       {c.donations.map(d => (
                         <li key={d.id}>
@@ -162,7 +193,8 @@ const AdminDashboard = () => {
                     </ul>
                   </td>
                   <td>
-                    {c.stories.length}
+                    {c.story_count}
+                    {c.stories.length < c.story_count && <div><small>Latest {c.stories.length} shown</small></div>}
                     <ul>
                       {c.stories.map(s => (
                         <li key={s.id}>{s.title} (Posted: {new Date(s.date).toLocaleDateString()})</li>
@@ -181,6 +213,10 @@ const AdminDashboard = () => {
               ))}
             </tbody>
           </Table>
+          <p>Showing {charities.length} of {charityPage.total} charities</p>
+          {charityPage.next && (
+            <Button variant="secondary" size="sm" onClick={() => loadMore('/api/admin/charities', charityPage, setCharities, setCharityPage)}>Load more charities</Button>
+          )}
         </Card.Body>
       </Card>
 
@@ -204,7 +240,8 @@ const AdminDashboard = () => {
                   <td>{d.email}</td>
                   <td>{d.credits}</td>
                   <td>
-                    {d.donations.length} (Total: {d.donations.reduce((sum, don) => sum + don.amount, 0)} credits)
+                    {d.donation_count} (Total: {d.donation_total} credits)
+                    {d.donations.length < d.donation_count && <div><small>Latest {d.donations.length} shown</small></div>}
                     <ul>
                       {d.donations.map(don => (
                         <li key={don.id}>
@@ -214,7 +251,8 @@ const AdminDashboard = () => {
                     </ul>
                   </td>
                   <td>
-                    {d.credit_transactions.length} (Total: {d.credit_transactions.reduce((sum, t) => sum + t.amount, 0)} credits)
+                    {d.purchase_count} (Total: {d.purchase_total} credits)
+                    {d.credit_transactions.length < d.purchase_count && <div><small>Latest {d.credit_transactions.length} shown</small></div>}
                     <ul>
                       {d.credit_transactions.map(t => (
                         <li key={t.id}>
@@ -227,6 +265,10 @@ const AdminDashboard = () => {
               ))}
             </tbody>
           </Table>
+          <p>Showing {donors.length} of {donorPage.total} donors</p>
+          {donorPage.next && (
+            <Button variant="secondary" size="sm" onClick={() => loadMore('/api/admin/donors', donorPage, setDonors, setDonorPage)}>Load more donors</Button>
+          )}
         </Card.Body>
       </Card>
     </Container>